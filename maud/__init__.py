@@ -1,20 +1,22 @@
-import os
+"""Maud: Bayesian statistical models of metabolic networks.
 
-import cmdstanpy
+The compiled Stan models are available as ``maud.MODEL`` and
+``maud.OUT_OF_SAMPLE_MODEL``. They are loaded the first time they are
+accessed, so that importing Maud does not require CmdStan.
 
-from maud.running_stan import (
-    CMDSTAN_VERSION,
-    STAN_FILES_FOLDER,
-    load_stan_model,
-)
+"""
 
-# on Windows specifically, we should point cmdstanpy to the repackaged
-# CmdStan if it exists. This lets cmdstanpy handle the TBB path for us.
-local_cmdstan = STAN_FILES_FOLDER / f"cmdstan-{CMDSTAN_VERSION}"
-if os.path.exists(local_cmdstan):
-    cmdstanpy.set_cmdstan_path(str((local_cmdstan.resolve())))
+_LAZY_MODELS = {"MODEL": "model", "OUT_OF_SAMPLE_MODEL": "out_of_sample_model"}
 
-MODEL = load_stan_model("model", cpp_options={}, stanc_options={})
-OUT_OF_SAMPLE_MODEL = load_stan_model(
-    "out_of_sample_model", cpp_options={}, stanc_options={}
-)
+
+def __getattr__(name):
+    """Load the Stan models on first access."""
+    if name in _LAZY_MODELS:
+        from maud.running_stan import load_stan_model
+
+        model = load_stan_model(
+            _LAZY_MODELS[name], cpp_options={}, stanc_options={}
+        )
+        globals()[name] = model
+        return model
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -16,30 +16,57 @@
 
 """Functions that are exposed to the command line interface live here."""
 
+import glob
 import json
 import os
 import shutil
 from datetime import datetime
+from typing import Optional
 
-import arviz as az
 import click
 import importlib_resources
-from stanio import write_stan_json
 
 from maud.data.example_inputs import linear, methionine
-from maud.getting_idatas import get_idata
-from maud.loading_maud_inputs import load_maud_input
-from maud.running_stan import (
-    laplace,
-    optimize,
-    pathfinder,
-    predict,
-    sample,
-    simulate,
-    variational,
-)
+
+# Modules that need heavy dependencies like arviz, cmdstanpy, scipy and
+# pandas are imported inside the commands that use them, so that `maud
+# --help` and `maud load-input` start quickly.
 
 AVAILABLE_EXAMPLE_INPUTS = {"linear": linear, "methionine": methionine}
+NO_CACHE_OPTION = click.option(
+    "--no-cache",
+    is_flag=True,
+    default=False,
+    help="Parse the input from scratch and do not store files in the cache.",
+)
+
+
+def get_cache_dir(no_cache: bool) -> Optional[str]:
+    """Get the input cache directory, or None if it should not be used."""
+    from maud.loading_maud_inputs import DEFAULT_CACHE_DIR
+
+    return None if no_cache else DEFAULT_CACHE_DIR
+
+
+def save_bundle(mi, output_path: str) -> None:
+    """Save the parts of mi that downstream commands need in output_path.
+
+    The bundle records a hash of the copied user input, so that
+    load_maud_input_from_output can tell if it has been changed since.
+
+    """
+    from maud.data_model.maud_bundle import (
+        BUNDLE_FILE_NAME,
+        get_maud_bundle,
+        write_maud_bundle,
+    )
+    from maud.loading_maud_inputs import get_input_hash
+
+    input_hash = get_input_hash(os.path.join(output_path, "user_input"))
+    write_maud_bundle(
+        get_maud_bundle(mi, input_hash),
+        os.path.join(output_path, BUNDLE_FILE_NAME),
+    )
 
 
 @click.group()
@@ -68,12 +95,13 @@ def load_input_command(input_name, output_dir):
 
 
 @cli.command("sample")
+@NO_CACHE_OPTION
 @click.option("--output_dir", default=".", help="Where to save Maud's output")
 @click.argument(
     "data_path",
     type=click.Path(exists=True, dir_okay=True, file_okay=False),
 )
-def sample_command(data_path, output_dir):
+def sample_command(data_path, output_dir, no_cache):
     """Generate MCMC samples given a user input directory.
 
     This function creates a new directory in output_dir with a name starting
@@ -85,10 +113,10 @@ def sample_command(data_path, output_dir):
 
     Run the sample function as a click command.
     """
-    click.echo(do_sample(data_path, output_dir))
+    click.echo(do_sample(data_path, output_dir, get_cache_dir(no_cache)))
 
 
-def do_sample(data_path, output_dir):
+def do_sample(data_path, output_dir, cache_dir=None):
     """Generate MCMC samples given a user input directory.
 
     This function creates a new directory in output_dir with a name starting
@@ -98,7 +126,11 @@ def do_sample(data_path, output_dir):
     of cmdstanpy's diagnose and summary methods.
 
     """
-    mi = load_maud_input(data_path)
+    from maud.getting_idatas import get_idata
+    from maud.loading_maud_inputs import load_maud_input
+    from maud.running_stan import sample
+
+    mi = load_maud_input(data_path, cache_dir=cache_dir)
     now = datetime.now().strftime("%Y%m%d%H%M%S")
     output_name = f"maud_output-{mi.config.name}-{now}"
     output_path = os.path.join(output_dir, output_name)
@@ -109,6 +141,7 @@ def do_sample(data_path, output_dir):
     os.mkdir(samples_path)
     print(f"Copying user input from {data_path} to {ui_dir}")
     shutil.copytree(data_path, ui_dir)
+    save_bundle(mi, output_path)
     stanfit = sample(mi, samples_path)
     print(stanfit.diagnose())
     print(stanfit.summary())
@@ -125,11 +158,12 @@ def do_sample(data_path, output_dir):
 
 
 @cli.command("predict")
+@NO_CACHE_OPTION
 @click.argument(
     "data_path",
     type=click.Path(exists=True, dir_okay=True, file_okay=False),
 )
-def predict_command(data_path):
+def predict_command(data_path, no_cache):
     """Generate MCMC samples given a Maud output folder at train_path.
 
     This function creates a new directory in output_dir with a name starting
@@ -142,10 +176,10 @@ def predict_command(data_path):
     with the user input required to generate the trained samples.
 
     """
-    click.echo(do_predict(data_path))
+    click.echo(do_predict(data_path, get_cache_dir(no_cache)))
 
 
-def do_predict(data_path: str):
+def do_predict(data_path: str, cache_dir: Optional[str] = None):
     """Generate MCMC samples given a Maud output folder at train_path.
 
     This function creates a new directory in output_dir with a name starting
@@ -157,9 +191,21 @@ def do_predict(data_path: str):
     The trained output is stored in the new_dir/trained_samples folder along
     with the user input required to generate the trained samples.
 
+    If the output folder contains a bundle of the validated input, and the
+    user input has not changed since the bundle was written, the bundle is
+    used instead of parsing the user input again.
+
+    The posterior draws are read from the csv files that maud sample wrote in
+    the samples folder.
+
     """
-    idata_train = az.from_netcdf(os.path.join(data_path, "idata.nc"))
-    mi = load_maud_input(os.path.join(data_path, "user_input"))
+    from maud.loading_maud_inputs import load_maud_input_from_output
+    from maud.running_stan import predict
+
+    fit_csv_files = sorted(
+        glob.glob(os.path.join(data_path, "samples", "*.csv"))
+    )
+    mi = load_maud_input_from_output(data_path, cache_dir=cache_dir)
     now = datetime.now().strftime("%Y%m%d%H%M%S")
     output_name = f"maud-predict_output-{mi.config.name}-{now}"
     output_path = os.path.join(data_path, output_name)
@@ -167,37 +213,43 @@ def do_predict(data_path: str):
     print("Creating output directory: " + output_path)
     os.mkdir(output_path)
     os.mkdir(test_samples_path)
-    idata_predict = predict(mi, output_path, idata_train)
+    idata_predict = predict(mi, output_path, fit_csv_files)
     idata_predict.posterior.attrs = {}  # error with netcdf
     idata_predict.to_netcdf(os.path.join(output_path, "idata_predict.json"))
 
 
 @cli.command("simulate")
+@NO_CACHE_OPTION
 @click.option("--output_dir", default=".", help="Where to save the output")
 @click.option("-n", default=1, type=int, help="Number of simulations")
 @click.argument(
     "data_path",
     type=click.Path(exists=True, dir_okay=True, file_okay=False),
 )
-def simulate_command(data_path, output_dir, n):
+def simulate_command(data_path, output_dir, n, no_cache):
     """Generate draws from the initial values."""
-    click.echo(do_simulate(data_path, output_dir, n))
+    click.echo(do_simulate(data_path, output_dir, n, get_cache_dir(no_cache)))
 
 
 @cli.command("optimize")
+@NO_CACHE_OPTION
 @click.option("--output_dir", default=".", help="Where to save the output")
 @click.argument(
     "data_path",
     type=click.Path(exists=True, dir_okay=True, file_okay=False),
 )
-def optimize_command(data_path, output_dir):
+def optimize_command(data_path, output_dir, no_cache):
     """Optimize the model parameters."""
-    click.echo(do_optimize(data_path, output_dir))
+    click.echo(do_optimize(data_path, output_dir, get_cache_dir(no_cache)))
 
 
-def do_simulate(data_path, output_dir, n):
+def do_simulate(data_path, output_dir, n, cache_dir=None):
     """Generate draws from the initial values."""
-    mi = load_maud_input(data_path=data_path)
+    from maud.getting_idatas import get_idata
+    from maud.loading_maud_inputs import load_maud_input
+    from maud.running_stan import simulate
+
+    mi = load_maud_input(data_path, cache_dir=cache_dir)
     now = datetime.now().strftime("%Y%m%d%H%M%S")
     output_name = f"maud_output_sim-{mi.config.name}-{now}"
     output_path = os.path.join(output_dir, output_name)
@@ -208,6 +260,7 @@ def do_simulate(data_path, output_dir, n):
     os.mkdir(samples_path)
     print(f"Copying user input from {data_path} to {ui_dir}")
     shutil.copytree(data_path, ui_dir)
+    save_bundle(mi, output_path)
     stanfit = simulate(mi, samples_path, n)
     idata = get_idata(stanfit.runset.csv_files, mi, "train")
     idata.to_netcdf(os.path.join(output_path, "idata.nc"))
@@ -349,9 +402,13 @@ def do_simulate(data_path, output_dir, n):
     return output_path
 
 
-def do_optimize(data_path, output_dir):
+def do_optimize(data_path, output_dir, cache_dir=None):
     """Optimize the model parameters."""
-    mi = load_maud_input(data_path=data_path)
+    from maud.getting_idatas import get_idata
+    from maud.loading_maud_inputs import load_maud_input
+    from maud.running_stan import optimize
+
+    mi = load_maud_input(data_path, cache_dir=cache_dir)
     now = datetime.now().strftime("%Y%m%d%H%M%S")
     output_name = f"maud_output_opt-{mi.config.name}-{now}"
     output_path = os.path.join(output_dir, output_name)
@@ -362,6 +419,7 @@ def do_optimize(data_path, output_dir):
     os.mkdir(samples_path)
     print(f"Copying user input from {data_path} to {ui_dir}")
     shutil.copytree(data_path, ui_dir)
+    save_bundle(mi, output_path)
     stanfit = optimize(mi, samples_path)
     idata = get_idata(stanfit.runset.csv_files, mi, "train")
     idata.to_netcdf(os.path.join(output_path, "idata.nc"))
@@ -475,12 +533,13 @@ def do_optimize(data_path, output_dir):
 
 
 @cli.command("variational")
+@NO_CACHE_OPTION
 @click.option("--output_dir", default=".", help="Where to save Maud's output")
 @click.argument(
     "data_path",
     type=click.Path(exists=True, dir_okay=True, file_okay=False),
 )
-def variational_command(data_path, output_dir):
+def variational_command(data_path, output_dir, no_cache):
     """Generate MCMC samples given a user input directory.
 
     This function creates a new directory in output_dir with a name starting
@@ -490,10 +549,10 @@ def variational_command(data_path, output_dir):
     of cmdstanpy's diagnose and summary methods.
 
     """
-    click.echo(do_variational(data_path, output_dir))
+    click.echo(do_variational(data_path, output_dir, get_cache_dir(no_cache)))
 
 
-def do_variational(data_path, output_dir):
+def do_variational(data_path, output_dir, cache_dir=None):
     """Generate MCMC samples given a user input directory.
 
     This function creates a new directory in output_dir with a name starting
@@ -503,7 +562,10 @@ def do_variational(data_path, output_dir):
     of cmdstanpy's diagnose and summary methods.
 
     """
-    mi = load_maud_input(data_path)
+    from maud.loading_maud_inputs import load_maud_input
+    from maud.running_stan import variational
+
+    mi = load_maud_input(data_path, cache_dir=cache_dir)
     now = datetime.now().strftime("%Y%m%d%H%M%S")
     output_name = f"maud_output_vi-{mi.config.name}-{now}"
     output_path = os.path.join(output_dir, output_name)
@@ -514,24 +576,31 @@ def do_variational(data_path, output_dir):
     os.mkdir(samples_path)
     print(f"Copying user input from {data_path} to {ui_dir}")
     shutil.copytree(data_path, ui_dir)
+    save_bundle(mi, output_path)
     variational(mi, samples_path)
     return output_path
 
 
 @cli.command("pathfinder")
+@NO_CACHE_OPTION
 @click.option("--output_dir", default=".", help="Where to save Maud's output")
 @click.argument(
     "data_path",
     type=click.Path(exists=True, dir_okay=True, file_okay=False),
 )
-def pathfinder_command(data_path, output_dir):
+def pathfinder_command(data_path, output_dir, no_cache):
     """Generate draws using the pathfinder algorithm."""
-    click.echo(do_pathfinder(data_path, output_dir))
+    click.echo(do_pathfinder(data_path, output_dir, get_cache_dir(no_cache)))
 
 
-def do_pathfinder(data_path, output_dir):
+def do_pathfinder(data_path, output_dir, cache_dir=None):
     """Generate draws using the pathfinder algorithm."""
-    mi = load_maud_input(data_path)
+    from stanio import write_stan_json
+
+    from maud.loading_maud_inputs import load_maud_input
+    from maud.running_stan import pathfinder
+
+    mi = load_maud_input(data_path, cache_dir=cache_dir)
     now = datetime.now().strftime("%Y%m%d%H%M%S")
     output_name = f"maud_output_pf-{mi.config.name}-{now}"
     output_path = os.path.join(output_dir, output_name)
@@ -542,6 +611,7 @@ def do_pathfinder(data_path, output_dir):
     os.mkdir(samples_path)
     print(f"Copying user input from {data_path} to {ui_dir}")
     shutil.copytree(data_path, ui_dir)
+    save_bundle(mi, output_path)
     pf = pathfinder(mi, samples_path)
     inits_pf = pf.create_inits()
     for i, inits_dict in enumerate(inits_pf):
@@ -553,19 +623,24 @@ def do_pathfinder(data_path, output_dir):
 
 
 @cli.command("laplace")
+@NO_CACHE_OPTION
 @click.option("--output_dir", default=".", help="Where to save the output")
 @click.argument(
     "data_path",
     type=click.Path(exists=True, dir_okay=True, file_okay=False),
 )
-def laplace_command(data_path, output_dir):
+def laplace_command(data_path, output_dir, no_cache):
     """Generate approximate posterior draws using the Laplace method."""
-    click.echo(do_laplace(data_path, output_dir))
+    click.echo(do_laplace(data_path, output_dir, get_cache_dir(no_cache)))
 
 
-def do_laplace(data_path, output_dir):
+def do_laplace(data_path, output_dir, cache_dir=None):
     """Generate approximate posterior draws using the Laplace method."""
-    mi = load_maud_input(data_path=data_path)
+    from maud.getting_idatas import get_idata
+    from maud.loading_maud_inputs import load_maud_input
+    from maud.running_stan import laplace
+
+    mi = load_maud_input(data_path, cache_dir=cache_dir)
     now = datetime.now().strftime("%Y%m%d%H%M%S")
     output_name = f"maud_output_laplace-{mi.config.name}-{now}"
     output_path = os.path.join(output_dir, output_name)
@@ -576,6 +651,7 @@ def do_laplace(data_path, output_dir):
     os.mkdir(samples_path)
     print(f"Copying user input from {data_path} to {ui_dir}")
     shutil.copytree(data_path, ui_dir)
+    save_bundle(mi, output_path)
     laplace_fit = laplace(mi, samples_path)
     idata = get_idata(laplace_fit._runset.csv_files, mi, "train")
     idata.to_netcdf(os.path.join(output_path, "idata.nc"))
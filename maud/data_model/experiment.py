@@ -1,11 +1,22 @@
 """Provides model Experiment."""
 
 from enum import Enum
-from typing import List, Optional
+from functools import cached_property
+from typing import Any, Dict, List, Optional
 
-from pydantic import BaseModel, Field, computed_field, field_validator
+import numpy as np
+import pandas as pd
+from pydantic import (
+    BaseModel,
+    ConfigDict,
+    Field,
+    computed_field,
+    field_validator,
+    model_validator,
+)
 
 from maud.data_model.hardcoding import ID_SEPARATOR
+from maud.utility_functions import clear_cached_properties
 
 
 class MeasurementType(str, Enum):
@@ -50,6 +61,191 @@ class Measurement(BaseModel):
             return self.moiety_id
 
 
+class MeasurementTable(BaseModel):
+    """Columnar representation of some experiments' measurements.
+
+    Each column is a numpy array with one entry per measurement, in the order
+    of the experiments and then of each experiment's measurements. The
+    experiment_code column contains 0-based positions in experiment_ids.
+
+    """
+
+    experiment_ids: List[str]
+    experiment_code: np.ndarray
+    target_type: np.ndarray
+    target_id: np.ndarray
+    value: np.ndarray
+    error_scale: np.ndarray
+    model_config: ConfigDict = {"arbitrary_types_allowed": True}
+
+    def __len__(self) -> int:
+        """Get the number of measurements."""
+        return len(self.value)
+
+    @cached_property
+    def experiment(self) -> np.ndarray:
+        """Get the id of each measurement's experiment."""
+        return np.array(self.experiment_ids, dtype=str)[self.experiment_code]
+
+    def is_type(self, target_type: MeasurementType) -> np.ndarray:
+        """Get a mask for the measurements with a certain target type."""
+        return self.target_type == target_type.value
+
+    def in_experiments(self, experiment_ids: List[str]) -> np.ndarray:
+        """Get a mask for the measurements from some experiments."""
+        wanted = set(experiment_ids)
+        is_wanted = np.array([e in wanted for e in self.experiment_ids])
+        return is_wanted[self.experiment_code]
+
+    def select(self, mask: np.ndarray) -> "MeasurementTable":
+        """Get a table with the measurements where mask is True."""
+        return MeasurementTable(
+            experiment_ids=self.experiment_ids,
+            experiment_code=self.experiment_code[mask],
+            target_type=self.target_type[mask],
+            target_id=self.target_id[mask],
+            value=self.value[mask],
+            error_scale=self.error_scale[mask],
+        )
+
+    def get_target_codes(self, target_ids: List[str]) -> np.ndarray:
+        """Get the 1-based position of each target in a list of ids."""
+        positions = pd.Index(target_ids).get_indexer(self.target_id)
+        if (positions < 0).any():
+            unknown = sorted(set(self.target_id[positions < 0]))
+            raise ValueError(f"Measurements have unknown targets {unknown}.")
+        return positions + 1
+
+
+def get_measurement_table(
+    measurements: List[Measurement], experiment_ids: List[str]
+) -> MeasurementTable:
+    """Get a MeasurementTable from a list of Measurement objects."""
+    experiment_index = dict(zip(experiment_ids, range(len(experiment_ids))))
+    return MeasurementTable(
+        experiment_ids=experiment_ids,
+        experiment_code=np.array(
+            [experiment_index[m.experiment] for m in measurements], dtype=int
+        ),
+        target_type=np.array(
+            [m.target_type.value for m in measurements], dtype=str
+        ),
+        target_id=np.array([m.target_id for m in measurements], dtype=str),
+        value=np.array([m.value for m in measurements], dtype=float),
+        error_scale=np.array(
+            [m.error_scale for m in measurements], dtype=float
+        ),
+    )
+
+
+def concatenate_measurement_tables(
+    tables: List[MeasurementTable],
+) -> MeasurementTable:
+    """Stack some measurement tables into one table.
+
+    Experiments that appear in more than one table are merged.
+
+    """
+    experiment_ids = list(
+        dict.fromkeys(eid for t in tables for eid in t.experiment_ids)
+    )
+    experiment_index = dict(zip(experiment_ids, range(len(experiment_ids))))
+    return MeasurementTable(
+        experiment_ids=experiment_ids,
+        experiment_code=np.concatenate(
+            [np.zeros(0, dtype=int)]
+            + [
+                np.array(
+                    [experiment_index[eid] for eid in t.experiment_ids],
+                    dtype=int,
+                )[t.experiment_code]
+                for t in tables
+            ]
+        ),
+        **{
+            col: np.concatenate(
+                [np.zeros(0, dtype=dtype)] + [getattr(t, col) for t in tables]
+            )
+            for col, dtype in [
+                ("target_type", str),
+                ("target_id", str),
+                ("value", float),
+                ("error_scale", float),
+            ]
+        },
+    )
+
+
+def read_measurement_tables(path: str) -> Dict[str, MeasurementTable]:
+    """Read a csv file of measurements into one MeasurementTable per experiment.
+
+    The file must have columns "experiment", "target_type", "value" and
+    "error_scale", as well as whichever of "metabolite", "compartment",
+    "reaction", "enzyme" and "moiety_id" are needed to identify the targets.
+
+    :param path: path to the csv file
+
+    """
+    target_columns = {
+        MeasurementType.MIC: ["metabolite", "compartment"],
+        MeasurementType.FLUX: ["reaction"],
+        MeasurementType.ENZYME: ["enzyme"],
+        MeasurementType.CONSERVED_MOIETY: ["moiety_id"],
+    }
+    id_columns = ["experiment", "target_type"] + [
+        c for cs in target_columns.values() for c in cs
+    ]
+    df = pd.read_csv(
+        path, dtype={c: str for c in id_columns}, keep_default_na=False
+    )
+    missing = {"experiment", "target_type", "value", "error_scale"} - set(
+        df.columns
+    )
+    if len(missing) > 0:
+        raise ValueError(f"{path} is missing columns {sorted(missing)}.")
+    value = df["value"].to_numpy(dtype=float)
+    error_scale = df["error_scale"].to_numpy(dtype=float)
+    if not np.isfinite(value).all():
+        raise ValueError(f"{path} has non-finite measured values.")
+    if not (np.isfinite(error_scale) & (error_scale > 0)).all():
+        raise ValueError(f"{path} has non-positive or non-finite error scales.")
+    target_type = df["target_type"].to_numpy(dtype=str)
+    target_id = np.full(len(df), "", dtype=object)
+    for mtype, cols in target_columns.items():
+        is_mtype = target_type == mtype.value
+        if not is_mtype.any():
+            continue
+        for c in cols:
+            if c not in df.columns or (df.loc[is_mtype, c] == "").any():
+                raise ValueError(
+                    f"{path} has {mtype.value} measurements without a {c}."
+                )
+        target_id[is_mtype] = (
+            df.loc[is_mtype, cols[0]]
+            .str.cat(df.loc[is_mtype, cols[1:]], sep=ID_SEPARATOR)
+            .to_numpy()
+        )
+    bad_types = set(target_type[target_id == ""])
+    if len(bad_types) > 0:
+        raise ValueError(
+            f"{path} has unsupported target types {sorted(bad_types)}."
+        )
+    target_id = target_id.astype(str)
+    return {
+        experiment_id: MeasurementTable(
+            experiment_ids=[experiment_id],
+            experiment_code=np.zeros(len(ix), dtype=int),
+            target_type=target_type[ix],
+            target_id=target_id[ix],
+            value=value[ix],
+            error_scale=error_scale[ix],
+        )
+        for experiment_id, ix in df.groupby(
+            "experiment", sort=False
+        ).indices.items()
+    }
+
+
 class EnzymeKnockout(BaseModel):
     """Maud representation of an enzyme being knocked out in an experiment."""
 
@@ -94,6 +290,9 @@ class Experiment(BaseModel):
     This means a case where the boundary conditions and all measured quantities
     can be assumed to be the same - often the term "condition" is used for this.
 
+    Measurements can be given as Measurement objects, or, for large datasets,
+    as a MeasurementTable read from a columnar file, or both.
+
     """
 
     id: str
@@ -106,6 +305,36 @@ class Experiment(BaseModel):
     pme_knockouts: List[PhosphorylationModifyingEnzymeKnockout] = Field(
         default_factory=lambda: []
     )
+    tabular_measurements: Optional[MeasurementTable] = None
+
+    def __setattr__(self, name, value):
+        """Set an attribute, clearing the cache if it is a field."""
+        super().__setattr__(name, value)
+        if name in type(self).model_fields:
+            self.clear_cache()
+
+    def model_copy(
+        self, *, update: Optional[Dict[str, Any]] = None, deep: bool = False
+    ) -> "Experiment":
+        """Copy the model, clearing the cache if update changes a field."""
+        copied = super().model_copy(update=update, deep=deep)
+        if update is not None and set(update) & set(type(self).model_fields):
+            copied.clear_cache()
+        return copied
+
+    def clear_cache(self) -> None:
+        """Forget the cached measurement table."""
+        clear_cached_properties(self)
+
+    @cached_property
+    def measurement_table(self) -> MeasurementTable:
+        """Get the experiment's measurements as a MeasurementTable."""
+        table = get_measurement_table(self.measurements, [self.id])
+        if self.tabular_measurements is None:
+            return table
+        return concatenate_measurement_tables(
+            [table, self.tabular_measurements]
+        )
 
     @field_validator("temperature")
     def temp_must_be_non_negative(cls, v):
@@ -113,9 +342,25 @@ class Experiment(BaseModel):
         assert v >= 0
         return v
 
+    @model_validator(mode="after")
+    def tabular_measurements_must_be_own(self) -> "Experiment":
+        """Make sure any tabular measurements belong to this experiment."""
+        if self.tabular_measurements is not None:
+            assert self.tabular_measurements.experiment_ids == [
+                self.id
+            ], f"{self.id} has tabular measurements from another experiment"
+        return self
+
+
+def parse_experiment(
+    raw: dict, tabular_measurements: Optional[MeasurementTable] = None
+):
+    """Get an Experiment object from a dictionary that comes from toml.load.
+
+    :param raw: the experiment's entry in a parsed experiments file
+    :param tabular_measurements: measurements read from a columnar file
 
-def parse_experiment(raw: dict):
-    """Get an Experiment object from a dictionary that comes from toml.load."""
+    """
     special = {"measurements": [], "enzyme_knockouts": [], "pme_knockouts": []}
     not_special = {k: v for k, v in raw.items() if k not in special.keys()}
     for k, obj in zip(
@@ -124,4 +369,16 @@ def parse_experiment(raw: dict):
     ):
         if k in raw.keys():
             special[k] = [obj(experiment=raw["id"], **r) for r in raw[k]]
-    return Experiment(**{**special, **not_special})
+    return Experiment(
+        **{**special, **not_special},
+        tabular_measurements=tabular_measurements,
+    )
+
+
+def get_experiments_measurement_table(
+    experiments: List[Experiment],
+) -> MeasurementTable:
+    """Get a MeasurementTable with all of some experiments' measurements."""
+    return concatenate_measurement_tables(
+        [e.measurement_table for e in experiments]
+    )
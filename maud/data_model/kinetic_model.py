@@ -1,6 +1,7 @@
 """Maud's definition of a kinetic model."""
 
 from enum import Enum
+from functools import cached_property
 from typing import Dict, List, Optional, Union
 
 import numpy as np
@@ -12,9 +13,10 @@ from pydantic import (
     field_validator,
     model_validator,
 )
+from scipy import sparse
 
 from maud.data_model.hardcoding import ID_SEPARATOR
-from maud.utility_functions import get_left_nullspace
+from maud.utility_functions import clear_cached_properties, get_left_nullspace
 
 
 class ReactionMechanism(int, Enum):
@@ -273,7 +275,74 @@ class KineticModel(BaseModel):
     phosphorylations: Optional[List[Phosphorylation]]
     model_config: ConfigDict = {"arbitrary_types_allowed": True}
 
+    def __setattr__(self, name, value):
+        """Set an attribute, clearing the cache if it is a field."""
+        super().__setattr__(name, value)
+        if name in type(self).model_fields:
+            self.clear_cache()
+
+    def clear_cache(self) -> None:
+        """Forget all cached derived structures."""
+        clear_cached_properties(self)
+
+    @cached_property
+    def mic_index(self) -> Dict[str, int]:
+        """Map each mic id to its position in mics."""
+        return {mic.id: i for i, mic in enumerate(self.mics)}
+
+    @cached_property
+    def metabolite_index(self) -> Dict[str, int]:
+        """Map each metabolite id to its position in metabolites."""
+        return {m.id: i for i, m in enumerate(self.metabolites)}
+
+    @cached_property
+    def compartment_index(self) -> Dict[str, int]:
+        """Map each compartment id to its position in compartments."""
+        return {c.id: i for i, c in enumerate(self.compartments)}
+
+    @cached_property
+    def er_index(self) -> Dict[str, int]:
+        """Map each enzyme/reaction pair id to its position in ers."""
+        return {er.id: i for i, er in enumerate(self.ers)}
+
+    @cached_property
+    def reaction_index(self) -> Dict[str, int]:
+        """Map each reaction id to its position in reactions."""
+        return {r.id: i for i, r in enumerate(self.reactions)}
+
+    @cached_property
+    def enzyme_index(self) -> Dict[str, int]:
+        """Map each enzyme id to its position in enzymes."""
+        return {e.id: i for i, e in enumerate(self.enzymes)}
+
+    @cached_property
+    def edge_index(self) -> Dict[str, int]:
+        """Map each edge id to its position in edges."""
+        return {e.id: i for i, e in enumerate(self.edges)}
+
+    @cached_property
+    def edges_by_enzyme(self) -> Dict[str, List[int]]:
+        """Map each enzyme id to the positions of its edges, in order."""
+        out: Dict[str, List[int]] = {}
+        for i, e in enumerate(self.edges):
+            if isinstance(e, EnzymeReaction):
+                out.setdefault(e.enzyme_id, []).append(i)
+        return out
+
+    def get_reaction(self, reaction_id: str) -> Reaction:
+        """Get a reaction from its id."""
+        return self.reactions[self.reaction_index[reaction_id]]
+
+    def get_edge_reaction(
+        self, edge: Union[Reaction, EnzymeReaction]
+    ) -> Reaction:
+        """Get the reaction that an edge represents."""
+        if isinstance(edge, Reaction):
+            return edge
+        return self.get_reaction(edge.reaction_id)
+
     @computed_field
+    @cached_property
     def drains(self) -> List[Reaction]:
         """Add the drains field."""
         return [
@@ -281,44 +350,69 @@ class KineticModel(BaseModel):
         ]
 
     @computed_field
+    @cached_property
     def edges(self) -> List[Union[Reaction, EnzymeReaction]]:
         """Add the edges field."""
         return self.drains + self.ers
 
+    @cached_property
+    def stoichiometric_matrix_sparse(self) -> sparse.csr_matrix:
+        """Get the stoichiometric matrix in compressed sparse row format."""
+        return get_stoichiometric_matrix_sparse(
+            self.edges, self.mics, self.reactions
+        )
+
     @computed_field
+    @cached_property
     def stoichiometric_matrix(self) -> pd.DataFrame:
         """Add the stoichiometric_matrix field."""
-        return get_stoichiometric_matrix(self.edges, self.mics, self.reactions)
+        return pd.DataFrame(
+            self.stoichiometric_matrix_sparse.toarray(),
+            index=[mic.id for mic in self.mics],
+            columns=[e.id for e in self.edges],
+        )
 
     @computed_field
+    @cached_property
     def left_nullspace(self) -> pd.DataFrame:
         """Calculate the left nullspace."""
         balanced_mics = [mic.id for mic in self.mics if mic.balanced]
+        balanced_rows = [self.mic_index[mic_id] for mic_id in balanced_mics]
         left_nullspace = get_left_nullspace(
-            self.stoichiometric_matrix.loc[balanced_mics]
+            self.stoichiometric_matrix_sparse[balanced_rows].toarray()
         )
         left_nullspace[np.abs(left_nullspace) < 1e-10] = 0
         left_nullspace[np.abs(left_nullspace) > 1e-10] = 1
 
         return pd.DataFrame(left_nullspace.T, columns=balanced_mics)
 
+    @cached_property
+    def dependent_mics(self) -> List[str]:
+        """Get the ids of the mics that are solved from conserved moieties.
+
+        These are ordered by the rows of the left nullspace.
+
+        """
+        if len(self.left_nullspace) == 0:
+            return []
+        dependent_mets = [mic.solve for mic in self.conserved_moiety]
+        dep_idx = self.left_nullspace[dependent_mets]
+        dep_idx = [
+            dep_idx.index[dep_idx[met] == 1].item() for met in dependent_mets
+        ]
+        return [dependent_mets[i] for i in dep_idx]
+
     @computed_field
+    @cached_property
     def left_nullspace_independent(self) -> pd.DataFrame:
         """Add the independent left_nullspace entries."""
-        lns = self.left_nullspace
-        if len(lns) > 0:
-            dependent_mets = [mic.solve for mic in self.conserved_moiety]
-            dep_idx = lns[dependent_mets]
-            dep_idx = [
-                dep_idx.index[dep_idx[met] == 1].item()
-                for met in dependent_mets
-            ]
-            dependent_mets = [dependent_mets[i] for i in dep_idx]
-            return self.left_nullspace.drop(dependent_mets, axis=1)
+        if len(self.left_nullspace) > 0:
+            return self.left_nullspace.drop(self.dependent_mics, axis=1)
         else:
             return None
 
     @computed_field
+    @cached_property
     def phosphorylation_modifying_enzymes(
         self,
     ) -> Optional[List[PhosphorylationModifyingEnzyme]]:
@@ -365,37 +459,34 @@ class KineticModel(BaseModel):
     @model_validator(mode="after")
     def stoic_keys_must_be_mic_ids(self) -> "KineticModel":
         """Make sure reaction stoichiometries have existent mic ids."""
-        mic_ids = [mic.id for mic in self.mics]
         for r in self.reactions:
             for stoich_mic_id in r.stoichiometry.keys():
                 assert (
-                    stoich_mic_id in mic_ids
+                    stoich_mic_id in self.mic_index
                 ), f"{r.id} has stoichiometry for bad mic_id {stoich_mic_id}"
         return self
 
     @model_validator(mode="after")
     def mic_references_must_exist(self) -> "KineticModel":
         """Make sure mics have existent metabolite and compartment ids."""
-        metabolite_ids = [m.id for m in self.metabolites]
-        compartment_ids = [c.id for c in self.compartments]
         for mic in self.mics:
             assert (
-                mic.metabolite_id in metabolite_ids
+                mic.metabolite_id in self.metabolite_index
             ), f"{mic.id} has bad metabolite_id."
             assert (
-                mic.compartment_id in compartment_ids
+                mic.compartment_id in self.compartment_index
             ), f"{mic.id} has bad compartment_id."
         return self
 
     @model_validator(mode="after")
     def er_references_must_exist(self) -> "KineticModel":
         """Make sure ers have existent enzyme and reaction ids."""
-        enzyme_ids = [e.id for e in self.enzymes]
-        reaction_ids = [r.id for r in self.reactions]
         for er in self.ers:
-            assert er.enzyme_id in enzyme_ids, f"{er.id} has bad enzyme_id"
             assert (
-                er.reaction_id in reaction_ids
+                er.enzyme_id in self.enzyme_index
+            ), f"{er.id} has bad enzyme_id"
+            assert (
+                er.reaction_id in self.reaction_index
             ), f"{er.id} has bad reaction_id"
         return self
 
@@ -404,13 +495,13 @@ class KineticModel(BaseModel):
         """Make sure allosteries' external ids exist."""
         if self.allosteries is None:
             return self
-        enzyme_ids = [e.id for e in self.enzymes]
-        mic_ids = [mic.id for mic in self.mics]
         for allostery in self.allosteries:
             assert (
-                allostery.enzyme_id in enzyme_ids
+                allostery.enzyme_id in self.enzyme_index
             ), f"{allostery.id} has bad enzyme_id"
-            assert allostery.mic_id in mic_ids, f"{allostery.id} has bad mic_id"
+            assert (
+                allostery.mic_id in self.mic_index
+            ), f"{allostery.id} has bad mic_id"
         return self
 
     @model_validator(mode="after")
@@ -418,11 +509,9 @@ class KineticModel(BaseModel):
         """Make sure competitive inhibitions' external ids exist."""
         if self.competitive_inhibitions is None:
             return self
-        er_ids = [er.id for er in self.ers]
-        mic_ids = [mic.id for mic in self.mics]
         for ci in self.competitive_inhibitions:
-            assert ci.er_id in er_ids, f"{ci.id} has bad er_id"
-            assert ci.mic_id in mic_ids, f"{ci.mic_id} has bad mic_id"
+            assert ci.er_id in self.er_index, f"{ci.id} has bad er_id"
+            assert ci.mic_id in self.mic_index, f"{ci.mic_id} has bad mic_id"
         return self
 
     @model_validator(mode="after")
@@ -430,10 +519,9 @@ class KineticModel(BaseModel):
         """Make sure phosphorylations' external ids exist."""
         if self.phosphorylations is None:
             return self
-        enzyme_ids = [e.id for e in self.enzymes]
         for p in self.phosphorylations:
             assert (
-                p.modified_enzyme_id in enzyme_ids
+                p.modified_enzyme_id in self.enzyme_index
             ), f"{p.id} has bad enzyme_id"
         return self
 
@@ -445,39 +533,60 @@ class KineticModel(BaseModel):
         left_nullspace = left_nullspace.astype(int)
         if len(left_nullspace) > 0:
             mgs = [
-                sorted(con_moi.moiety_group)
+                tuple(sorted(con_moi.moiety_group))
                 for con_moi in self.conserved_moiety
             ]
             cms = [
-                sorted([m for m, n in zip(balanced_metabolites, lns) if n])
+                tuple(sorted(m for m, n in zip(balanced_metabolites, lns) if n))
                 for lns in left_nullspace
             ]
+            mg_set, cm_set = set(mgs), set(cms)
             for cm in cms:
                 assert (
-                    cm in mgs
-                ), f"{cm} not defined in kinetic model `moiety_group`"
+                    cm in mg_set
+                ), f"{list(cm)} not defined in kinetic model `moiety_group`"
             for mg in mgs:
                 assert (
-                    mg in cms
-                ), f"{mg} defined in kinetic model `moiety_group` \
+                    mg in cm_set
+                ), f"{list(mg)} defined in kinetic model `moiety_group` \
                 but may not be a conserved moiety"
         return self
 
 
+def get_stoichiometric_matrix_sparse(
+    edges: List[Union[Reaction, EnzymeReaction]],
+    mics: List[MetaboliteInCompartment],
+    rxns: List[Reaction],
+) -> sparse.csr_matrix:
+    """Get a sparse stoichiometric matrix from edges, mics and reactions.
+
+    Rows follow the order of mics and columns follow the order of edges.
+
+    """
+    mic_index = {mic.id: i for i, mic in enumerate(mics)}
+    rxn_by_id = {r.id: r for r in rxns}
+    rows, cols, values = [], [], []
+    for col, e in enumerate(edges):
+        rxn = e if isinstance(e, Reaction) else rxn_by_id[e.reaction_id]
+        for mic_id, stoic in rxn.stoichiometry.items():
+            rows.append(mic_index[mic_id])
+            cols.append(col)
+            values.append(stoic)
+    return sparse.csr_matrix(
+        (np.array(values, dtype=float), (rows, cols)),
+        shape=(len(mics), len(edges)),
+    )
+
+
 def get_stoichiometric_matrix(
     edges: List[Union[Reaction, EnzymeReaction]],
     mics: List[MetaboliteInCompartment],
     rxns: List[Reaction],
 ) -> pd.DataFrame:
     """Get a stoichiometric matrix from lists of edges, mics and reactions."""
-    edge_ids = [e.id for e in edges]
-    mic_ids = [mic.id for mic in mics]
-    S = pd.DataFrame(0, index=mic_ids, columns=edge_ids)
-    for e in edges:
-        if isinstance(e, Reaction):
-            rxn = e
-        else:
-            rxn = next(r for r in rxns if r.id == e.reaction_id)
-        for mic_id, stoic in rxn.stoichiometry.items():
-            S.loc[mic_id, e.id] = stoic
-    return S
+    S = get_stoichiometric_matrix_sparse(edges, mics, rxns)
+    return pd.DataFrame(
+        S.toarray(),
+        index=[mic.id for mic in mics],
+        columns=[e.id for e in edges],
+    )
@@ -0,0 +1,252 @@
+"""Provides model MaudBundle and functions for saving and loading it."""
+
+import hashlib
+import json
+from typing import Any, Dict, List, Optional, Union
+
+import numpy as np
+from pydantic import BaseModel
+
+from maud.data_model.experiment import MeasurementType
+from maud.data_model.hardcoding import ID_SEPARATOR
+from maud.data_model.maud_config import MaudConfig
+from maud.data_model.maud_input import MaudInput
+from maud.writing_stan_data import to_json_value
+
+BUNDLE_FORMAT_VERSION = "1"
+BUNDLE_FILE_NAME = "maud_input.npz"
+STAN_DICT_FIELDS = ("stan_input_train", "stan_input_test", "inits_dict")
+MODES = ("train", "test")
+
+
+class MaudBundle(BaseModel):
+    """The parts of a MaudInput that are needed after it has been validated.
+
+    A MaudBundle holds everything that the downstream functions in
+    running_stan and getting_idatas need, so that they can run on the output
+    of a previous Maud run without parsing its user input again.
+
+    :param config: the input's MaudConfig
+    :param stan_input_train: Stan input data for the training experiments
+    :param stan_input_test: Stan input data for the test experiments
+    :param inits_dict: initial values for the Stan model
+    :param coords: for each mode, the coordinates that get_idata needs
+    :param input_hash: hash of the input files that produced the bundle, as
+    returned by loading_maud_inputs.get_input_hash.
+
+    """
+
+    config: MaudConfig
+    stan_input_train: Dict
+    stan_input_test: Dict
+    inits_dict: Dict
+    coords: Dict[str, Dict[str, List[str]]]
+    input_hash: Optional[str] = None
+
+
+def get_coords(
+    mi: Union[MaudInput, MaudBundle], mode: str
+) -> Dict[str, List[str]]:
+    """Get the coordinates of Maud's output variables.
+
+    :param mi: a MaudInput object, or a MaudBundle with precomputed coords
+    :param mode: "train" or "test"
+
+    """
+    if isinstance(mi, MaudBundle):
+        return mi.coords[mode]
+    experiments = (
+        [e for e in mi.experiments if e.is_train]
+        if mode == "train"
+        else [e for e in mi.experiments if e.is_test]
+    )
+    measurements = mi.measurement_table.select(
+        mi.measurement_table.in_experiments([e.id for e in experiments])
+    )
+    yconc_coords, yflux_coords, yenz_coords = (
+        [
+            f"{exp_id}{ID_SEPARATOR}{target_id}"
+            for exp_id, target_id in zip(
+                ms.experiment.tolist(), ms.target_id.tolist()
+            )
+        ]
+        for ms in (
+            measurements.select(measurements.is_type(t))
+            for t in [
+                MeasurementType.MIC,
+                MeasurementType.FLUX,
+                MeasurementType.ENZYME,
+            ]
+        )
+    )
+    dependent_mics = (
+        [m.solve for m in mi.kinetic_model.conserved_moiety]
+        if mi.kinetic_model.conserved_moiety is not None
+        else []
+    )
+    return {
+        "enzymes": [e.id for e in mi.kinetic_model.enzymes],
+        "experiments": [e.id for e in experiments],
+        "reactions": [r.id for r in mi.kinetic_model.reactions],
+        "drains": [r.id for r in mi.kinetic_model.drains],
+        "metabolites": [m.id for m in mi.kinetic_model.metabolites],
+        "mics": [m.id for m in mi.kinetic_model.mics],
+        "conserved_moieties": (
+            [cm.id for cm in mi.kinetic_model.conserved_moiety]
+            if mi.kinetic_model.conserved_moiety is not None
+            else []
+        ),
+        "edges": [e.id for e in mi.kinetic_model.edges],
+        "edges1": [e.id for e in mi.kinetic_model.edges],
+        "unbalanced_mics": [
+            m.id for m in mi.kinetic_model.mics if not m.balanced
+        ],
+        "independent_mics": [
+            m.id
+            for m in mi.kinetic_model.mics
+            if (m.balanced) & (m.id not in dependent_mics)
+        ],
+        "phosphorylations": (
+            [p.id for p in mi.kinetic_model.phosphorylations]
+            if mi.kinetic_model.phosphorylations is not None
+            else []
+        ),
+        "phosphorylation_modifying_enzymes": (
+            [
+                pme.id
+                for pme in mi.kinetic_model.phosphorylation_modifying_enzymes
+            ]
+            if mi.kinetic_model.phosphorylation_modifying_enzymes is not None
+            else []
+        ),
+        "allosteries": (
+            [p.id for p in mi.kinetic_model.allosteries]
+            if mi.kinetic_model.allosteries is not None
+            else []
+        ),
+        "allosteric_enzymes": (
+            [e.id for e in mi.kinetic_model.allosteric_enzymes]
+            if mi.kinetic_model.allosteric_enzymes is not None
+            else []
+        ),
+        "competitive_inhibitions": (
+            [p.id for p in mi.kinetic_model.competitive_inhibitions]
+            if mi.kinetic_model.competitive_inhibitions is not None
+            else []
+        ),
+        "kms": mi.parameters.km.ids[0],
+        "kis": mi.parameters.ki.ids[0],
+        "dissociation_constants": (mi.parameters.dissociation_constant.ids[0]),
+        "yconcs": yconc_coords,
+        "yfluxs": yflux_coords,
+        "yenz": yenz_coords,
+    }
+
+
+def get_maud_bundle(
+    mi: MaudInput, input_hash: Optional[str] = None
+) -> MaudBundle:
+    """Get a MaudBundle from a MaudInput.
+
+    :param mi: a MaudInput object
+    :param input_hash: hash of the files that mi was loaded from
+
+    """
+    return MaudBundle(
+        config=mi.config,
+        stan_input_train=mi.stan_input_train,
+        stan_input_test=mi.stan_input_test,
+        inits_dict=mi.inits_dict,
+        coords={mode: get_coords(mi, mode) for mode in MODES},
+        input_hash=input_hash,
+    )
+
+
+def write_maud_bundle(bundle: MaudBundle, path: str) -> None:
+    """Save a MaudBundle to a compressed npz file.
+
+    Numeric values in the Stan dictionaries are saved as arrays. Everything
+    else goes in a json manifest that is saved in the same file, together
+    with a hash of the file's contents. The hash detects accidental
+    corruption, but not deliberate edits, since whoever edits the file can
+    update the hash too.
+
+    """
+    arrays: Dict[str, np.ndarray] = {}
+    manifest: Dict[str, Any] = {
+        "format_version": BUNDLE_FORMAT_VERSION,
+        "config": bundle.config.model_dump(mode="json"),
+        "coords": bundle.coords,
+        "input_hash": bundle.input_hash,
+    }
+    for field in STAN_DICT_FIELDS:
+        manifest[field] = {}
+        for k, v in getattr(bundle, field).items():
+            try:
+                array = np.asarray(v)
+            except ValueError:  # ragged list
+                array = None
+            if array is not None and array.dtype.kind in "biuf":
+                arrays[f"{field}.{k}"] = array
+                manifest[field][k] = {"array": f"{field}.{k}"}
+            else:
+                manifest[field][k] = {"value": v}
+    arrays["manifest"] = np.array(json.dumps(manifest, default=to_json_value))
+    arrays["content_hash"] = np.array(get_bundle_hash(arrays))
+    with open(path, "wb") as f:
+        np.savez_compressed(f, **arrays)
+
+
+def read_maud_bundle(path: str) -> MaudBundle:
+    """Load a MaudBundle from a file written by write_maud_bundle.
+
+    The bundle's contents were validated when it was written, so it is
+    constructed without validation once its content hash has been checked.
+    Only read bundles that Maud wrote, as the hash cannot show that a bundle
+    has not been tampered with.
+
+    """
+    with np.load(path, allow_pickle=False) as npz:
+        arrays = dict(npz)
+    content_hash = arrays.pop("content_hash", np.array(None)).item()
+    if content_hash != get_bundle_hash(arrays):
+        raise ValueError(f"Bundle {path} is corrupted.")
+    manifest = json.loads(arrays["manifest"].item())
+    if manifest["format_version"] != BUNDLE_FORMAT_VERSION:
+        raise ValueError(
+            f"Bundle {path} has format version "
+            f"{manifest['format_version']}, but this version of Maud "
+            f"reads version {BUNDLE_FORMAT_VERSION}."
+        )
+    stan_dicts = {
+        field: {
+            k: (
+                read_bundle_array(arrays[entry["array"]])
+                if "array" in entry
+                else entry["value"]
+            )
+            for k, entry in manifest[field].items()
+        }
+        for field in STAN_DICT_FIELDS
+    }
+    return MaudBundle.model_construct(
+        config=MaudConfig(**manifest["config"]),
+        coords=manifest["coords"],
+        input_hash=manifest["input_hash"],
+        **stan_dicts,
+    )
+
+
+def get_bundle_hash(arrays: Dict[str, np.ndarray]) -> str:
+    """Get a hash of the arrays in a bundle file."""
+    h = hashlib.sha256()
+    for name in sorted(arrays):
+        array = np.ascontiguousarray(arrays[name])
+        h.update(f"{name}:{array.dtype.str}:{array.shape}:".encode())
+        h.update(array.tobytes())
+    return h.hexdigest()
+
+
+def read_bundle_array(array: np.ndarray) -> Any:
+    """Turn zero-dimensional arrays back into Python scalars."""
+    return array.item() if array.ndim == 0 else array
@@ -1,29 +1,70 @@
 """Provides model MaudConfig."""
 
+from enum import Enum
 from typing import Optional
 
 from pydantic import BaseModel, ConfigDict, Field
 
 
 class ODESolverConfig(BaseModel):
-    """Config that is specific to an ODE solver."""
+    """Config that is specific to an ODE solver.
+
+    first_checkpoint and checkpoint_ratio define the times at which the
+    "ode_checkpoints" steady state solver checks whether it can stop
+    integrating before timepoint.
+
+    If log_concentration is true, the ODE is integrated in terms of the log
+    concentrations of the independent balanced mics, so abs_tol applies to
+    log concentrations. This is more accurate for small concentrations at the
+    same tolerances, but each solve can take longer.
+
+    """
 
     rel_tol: float = 1e-9
     abs_tol: float = 1e-9
     max_num_steps: int = int(1e7)
     timepoint: float = 1e4
+    first_checkpoint: float = Field(default=1.0, gt=0)
+    checkpoint_ratio: float = Field(default=10.0, gt=1)
+    log_concentration: bool = False
     model_config: ConfigDict = {"frozen": True}
 
 
 class AlgebraSolverConfig(BaseModel):
-    """Config that is specific to an ODE solver."""
+    """Config that is specific to an algebra solver.
+
+    rel_tol is the Powell solver's relative tolerance and scaling_step is the
+    Newton solver's scaling step size. abs_tol and max_num_steps apply to
+    both solvers. timepoint is how long to integrate the ODE before starting
+    the algebra solver.
+
+    """
 
     rel_tol: float = 1e-7
+    scaling_step: float = 1e-3
     abs_tol: float = 1e-7
     max_num_steps: int = int(1e6)
+    timepoint: float = 10.0
     model_config: ConfigDict = {"frozen": True}
 
 
+class SteadyStateSolver(str, Enum):
+    """Possible ways of finding steady states.
+
+    ode: integrate the ODE until ode_solver_config.timepoint.
+    newton, powell: integrate the ODE until algebra_solver_config.timepoint,
+    then solve for steady state with Stan's Newton or Powell solver.
+    ode_checkpoints: integrate the ODE until ode_solver_config.timepoint, but
+    stop at the first checkpoint where the steady state thresholds are met.
+
+    """
+
+    ode = "ode"
+    newton = "newton"
+    powell = "powell"
+    ode_checkpoints = "ode_checkpoints"
+
+
 class MaudConfig(BaseModel):
     """User's configuration for a Maud input.
 
@@ -31,13 +72,17 @@ class MaudConfig(BaseModel):
     :param kinetic_model_file: path to a valid kientic model file.
     :param priors_file: path to a valid priors file.
     :param experiments_file: path to a valid experiments file.
+    :param measurements_file: path to a csv file with more measurements.
     :param likelihood: Whether or not to take measurements into account.
     :param cmdstanpy_config: Arguments to cmdstanpy.CmdStanModel.sample.
     :param penalize_non_steady: Penalize the deviation from steady state in the log likelihood.
     :param ode_solver_config: Configuration for Stan's ode solver.
     :param algebra_solver_config: Configuration for Stan's algebra solver.
+    :param steady_state_solver: How to find steady states: "ode", "newton", "powell" or "ode_checkpoints".
     :param stanc_options: Options for CmdStanModel argument `stanc_options`.
     :param cpp_options: Options for CmdStanModel `cpp_options`.
+    :param threads_per_chain: Number of threads each chain uses to simulate experiments in parallel.
+    :param grainsize: Number of experiments that each thread simulates at a time.
     :param variational_options: Arguments for CmdStanModel.variational.
     :param pathfinder_options: Arguments for CmdStanModel.pathfinder.
     :param laplace_options: Arguments for CmdStanModel.laplace.
@@ -58,10 +103,13 @@ class MaudConfig(BaseModel):
     priors_file: str
     experiments_file: str
     likelihood: bool
+    measurements_file: Optional[str] = None
     cmdstanpy_config: Optional[dict] = None
     cmdstanpy_config_predict: Optional[dict] = None
     stanc_options: Optional[dict] = None
     cpp_options: Optional[dict] = None
+    threads_per_chain: int = Field(default=1, ge=1)
+    grainsize: int = Field(default=1, ge=1)
     variational_options: Optional[dict] = None
     pathfinder_options: Optional[dict] = None
     laplace_options: Optional[dict] = None
@@ -71,6 +119,7 @@ class MaudConfig(BaseModel):
     algebra_solver_config: AlgebraSolverConfig = Field(
         default_factory=AlgebraSolverConfig
     )
+    steady_state_solver: SteadyStateSolver = SteadyStateSolver.ode
     penalize_non_steady: bool = False
     steady_state_threshold_abs: float = 1e-8
     steady_state_threshold_rel: float = 1e-3
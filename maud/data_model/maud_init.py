@@ -1,12 +1,13 @@
 """Types that go in initial values specificaitons."""
 
-from typing import List, Optional, Tuple, Union
+from functools import cached_property
+from typing import Dict, List, Optional, Tuple, Union
 
 import numpy as np
 import pandas as pd
-from pydantic import BaseModel, computed_field
+from pydantic import BaseModel, ConfigDict, computed_field
 
-from maud.data_model.experiment import Measurement
+from maud.data_model.experiment import MeasurementTable
 from maud.data_model.hardcoding import ID_SEPARATOR
 from maud.data_model.id_component import IdComponent
 from maud.data_model.prior import IndPrior1d, IndPrior2d, PriorMVN
@@ -56,112 +57,143 @@ def get_init_atom_input_ids(
     )
 
 
+def get_index(ids: List[str]) -> Dict[str, int]:
+    """Get a map from id to position."""
+    return dict(zip(ids, range(len(ids))))
+
+
+def get_positions(ids: List[str], targets: np.ndarray) -> np.ndarray:
+    """Get the position of each target in ids, or -1 if it is not there."""
+    return pd.Index(ids).get_indexer(targets)
+
+
+def apply_overrides(
+    values: np.ndarray, overrides: Dict[Tuple[int, ...], float]
+) -> np.ndarray:
+    """Set the values at some positions of an array, in place."""
+    if len(overrides) > 0:
+        positions = tuple(np.array(list(overrides.keys())).T)
+        values[positions] = list(overrides.values())
+    return values
+
+
 class Init1d(BaseModel):
-    """A 1 dimensional initial values specification."""
+    """A 1 dimensional initial values specification.
+
+    Initial values start at the prior location. Measured values override
+    these, and user-specified inits override everything. Both the unscaled
+    and scaled inits are computed once and cached as numpy arrays.
+
+    """
 
     ids: List[List[str]]
     id_components: List[List[IdComponent]]
     prior: Union[IndPrior1d, PriorMVN]
     param_init_input: ParamInitInput
     non_negative: bool
-    measurements: Optional[List[Measurement]] = None
+    measurements: Optional[MeasurementTable] = None
+    model_config: ConfigDict = {"arbitrary_types_allowed": True}
 
     @computed_field
-    def inits_unscaled(self) -> List[float]:
+    @cached_property
+    def inits_unscaled(self) -> np.ndarray:
         """Add the inits_unscaled field."""
-        inits_pd = pd.Series(
-            self.prior.location, index=self.ids[0], dtype="float64"
-        )
+        inits = np.array(self.prior.location, dtype="float64")
         if self.non_negative:  # non-negative parameter location is on ln scale
-            inits_pd = np.exp(inits_pd)
+            inits = np.exp(inits)
+        index = get_index(self.ids[0])
+        overrides: Dict[Tuple[int, ...], float] = {}
         if self.measurements is not None:
-            for m in self.measurements:
-                if m.target_id in inits_pd.index:
-                    inits_pd.loc[m.target_id] = m.value
+            pos = get_positions(self.ids[0], self.measurements.target_id)
+            found = pos >= 0
+            overrides.update(
+                zip(
+                    zip(pos[found].tolist()),
+                    self.measurements.value[found].tolist(),
+                )
+            )
         if self.param_init_input is not None:
             for iai in self.param_init_input:
                 iai_id = get_init_atom_input_ids(iai, self.id_components)[0]
-                if iai_id in inits_pd.index:
-                    inits_pd.loc[iai_id] = iai.init
-        return inits_pd.tolist()
+                if iai_id in index:
+                    overrides[(index[iai_id],)] = iai.init
+        return apply_overrides(inits, overrides)
 
     @computed_field
-    def inits_scaled(self) -> Optional[List[float]]:
+    @cached_property
+    def inits_scaled(self) -> Optional[np.ndarray]:
         """Add the inits_scaled field."""
         if isinstance(
             self.prior, PriorMVN
         ):  # no need to rescale an MVN parameter
             return None
-        inits_pd = pd.Series(
-            self.inits_unscaled, index=self.ids[0], dtype="float64"
-        )
         inits_for_scaling = (
-            np.log(inits_pd) if self.non_negative else inits_pd.copy()
-        )
-        loc_pd = pd.Series(
-            self.prior.location, index=self.ids[0], dtype="float64"
-        )
-        scale_pd = pd.Series(
-            self.prior.scale, index=self.ids[0], dtype="float64"
+            np.log(self.inits_unscaled)
+            if self.non_negative
+            else self.inits_unscaled
         )
-        inits_pd_scaled = (inits_for_scaling - loc_pd) / scale_pd
-        return inits_pd_scaled.tolist()
+        return (inits_for_scaling - self.prior.location) / self.prior.scale
 
 
 class Init2d(BaseModel):
-    """A 2 dimensional initial values specification."""
+    """A 2 dimensional initial values specification.
+
+    Rows are experiments. Otherwise this works in the same way as Init1d.
+
+    """
 
     ids: List[List[str]]
     id_components: List[List[IdComponent]]
     prior: IndPrior2d
     param_init_input: ParamInitInput
     non_negative: bool
-    measurements: Optional[List[Measurement]] = None
+    measurements: Optional[MeasurementTable] = None
+    model_config: ConfigDict = {"arbitrary_types_allowed": True}
 
     @computed_field
-    def inits_unscaled(self) -> List[List[float]]:
+    @cached_property
+    def inits_unscaled(self) -> np.ndarray:
         """Add the inits_unscaled field."""
-        inits_pd = pd.DataFrame(
-            self.prior.location, index=self.ids[0], columns=self.ids[1]
-        )
+        shape = (len(self.ids[0]), len(self.ids[1]))
+        if 0 in shape:
+            return np.empty(shape)
+        inits = np.array(self.prior.location, dtype="float64")
         if self.non_negative:  # non-negative parameter location is on ln scale
-            inits_pd = np.exp(inits_pd)
+            inits = np.exp(inits)
+        row_index, col_index = get_index(self.ids[0]), get_index(self.ids[1])
+        overrides: Dict[Tuple[int, ...], float] = {}
         if self.measurements is not None:
-            for m in self.measurements:
-                if (
-                    m.target_id in inits_pd.columns
-                    and m.experiment in inits_pd.index
-                ):
-                    inits_pd.loc[m.experiment, m.target_id] = m.value
+            rows = get_positions(self.ids[0], self.measurements.experiment)
+            cols = get_positions(self.ids[1], self.measurements.target_id)
+            found = (rows >= 0) & (cols >= 0)
+            overrides.update(
+                zip(
+                    zip(rows[found].tolist(), cols[found].tolist()),
+                    self.measurements.value[found].tolist(),
+                )
+            )
         if self.param_init_input is not None:
             for iai in self.param_init_input:
                 iai_id_row, iai_id_col = get_init_atom_input_ids(
                     iai, self.id_components
                 )
-                if (
-                    iai_id_row in inits_pd.index
-                    and iai_id_col in inits_pd.columns
-                ):
-                    inits_pd.loc[iai_id_row, iai_id_col] = iai.init
-        return inits_pd.values.tolist()
+                if iai_id_row in row_index and iai_id_col in col_index:
+                    ix = (row_index[iai_id_row], col_index[iai_id_col])
+                    overrides[ix] = iai.init
+        return apply_overrides(inits, overrides)
 
     @computed_field
-    def inits_scaled(self) -> Optional[List[List[float]]]:
+    @cached_property
+    def inits_scaled(self) -> Optional[np.ndarray]:
         """Add the inits_scaled field."""
-        inits_pd = pd.DataFrame(
-            self.inits_unscaled, index=self.ids[0], columns=self.ids[1]
-        )
+        if 0 in self.inits_unscaled.shape:
+            return np.empty(self.inits_unscaled.shape)
         inits_for_scaling = (
-            np.log(inits_pd) if self.non_negative else inits_pd.copy()
-        )
-        loc_pd = pd.DataFrame(
-            self.prior.location, index=self.ids[0], columns=self.ids[1]
-        )
-        scale_pd = pd.DataFrame(
-            self.prior.scale, index=self.ids[0], columns=self.ids[1]
+            np.log(self.inits_unscaled)
+            if self.non_negative
+            else self.inits_unscaled
         )
-        inits_pd_scaled = (inits_for_scaling - loc_pd) / scale_pd
-        return inits_pd_scaled.values.tolist()
+        return (inits_for_scaling - self.prior.location) / self.prior.scale
 
 
 Init = Union[Init1d, Init2d]
@@ -1,21 +1,47 @@
 """Provides model MaudInput containing everything Maud needs to run."""
 
-from typing import Dict, List
+from functools import cached_property
+from typing import Any, ClassVar, Dict, List, Optional, Tuple
 
+import numpy as np
 from pydantic import BaseModel, Field, computed_field
 
-from maud.data_model.experiment import Experiment
+from maud.data_model.experiment import (
+    Experiment,
+    MeasurementTable,
+    get_experiments_measurement_table,
+)
 from maud.data_model.kinetic_model import KineticModel
 from maud.data_model.maud_config import MaudConfig
 from maud.data_model.maud_init import InitInput
 from maud.data_model.maud_parameter import MaudParameter
 from maud.data_model.parameter_input import ParameterSetInput
 from maud.data_model.parameter_set import ParameterSet
-from maud.getting_stan_inputs import get_stan_inputs
+from maud.getting_stan_inputs import (
+    combine_stan_inputs,
+    get_conc_init,
+    get_config_input,
+    get_experiments_input,
+    get_fixed_param_input,
+    get_network_properties_input,
+    get_prior_inputs,
+)
+from maud.utility_functions import clear_cached_properties
 
 
 class MaudInput(BaseModel):
-    """Everything that is needed to run Maud."""
+    """Everything that is needed to run Maud.
+
+    The parameters, Stan inputs and inits are derived from the other fields
+    the first time they are needed and then cached. The Stan inputs are built
+    in stages, each cached separately, so that assigning to a field, or
+    replacing it with `model_copy(update=...)`, only clears the stages that
+    depend on it: for example, assigning new experiments keeps the network
+    properties and the priors of parameters that do not depend on the
+    experiments. Call `clear_cache` after mutating a field in place, e.g. by
+    appending to `experiments`.
+
+    """
 
     config: MaudConfig
     kinetic_model: KineticModel
@@ -24,8 +50,96 @@ class MaudInput(BaseModel):
         default_factory=ParameterSetInput
     )
     init_input: InitInput = Field(default_factory=InitInput)
+    CACHE_DEPENDENCIES: ClassVar[Dict[str, Tuple[str, ...]]] = {
+        "parameters": ("kinetic_model", "parameter_set_input", "init_input"),
+        "measurement_table": ("experiments",),
+        "network_properties_input": ("kinetic_model",),
+        "fixed_param_input": ("kinetic_model", "parameter_set_input"),
+        "kinetic_prior_inputs": ("kinetic_model", "parameter_set_input"),
+        "experiment_prior_inputs": (
+            "kinetic_model",
+            "experiments",
+            "parameter_set_input",
+        ),
+        "experiments_input": ("kinetic_model", "experiments"),
+        "config_input": ("config",),
+        "conc_init": ("kinetic_model", "experiments", "config"),
+        "stan_inputs": (
+            "config",
+            "kinetic_model",
+            "experiments",
+            "parameter_set_input",
+        ),
+        "stan_input_train": (
+            "config",
+            "kinetic_model",
+            "experiments",
+            "parameter_set_input",
+        ),
+        "stan_input_test": (
+            "config",
+            "kinetic_model",
+            "experiments",
+            "parameter_set_input",
+        ),
+        "inits_dict": (
+            "kinetic_model",
+            "experiments",
+            "parameter_set_input",
+            "init_input",
+        ),
+    }
+
+    def __setattr__(self, name, value):
+        """Set an attribute, clearing the cache entries that depend on it."""
+        super().__setattr__(name, value)
+        if name in type(self).model_fields:
+            if name == "experiments" and "parameters" in self.__dict__:
+                self.parameters.experiments = value
+            self.clear_cache(name)
+
+    def model_copy(
+        self, *, update: Optional[Dict[str, Any]] = None, deep: bool = False
+    ) -> "MaudInput":
+        """Copy the model, clearing the cache entries that depend on update.
+
+        pydantic writes the updated fields straight into the copy's
+        `__dict__`, so `__setattr__` does not see them.
+
+        """
+        copied = super().model_copy(update=update, deep=deep)
+        for name, value in (update or {}).items():
+            if name in type(self).model_fields:
+                if name == "experiments" and "parameters" in copied.__dict__:
+                    copied.__dict__["parameters"] = (
+                        copied.parameters.model_copy(
+                            update={"experiments": value}
+                        )
+                    )
+                copied.clear_cache(name)
+        return copied
+
+    def clear_cache(self, field: Optional[str] = None) -> None:
+        """Forget cached derived quantities.
+
+        :param field: only forget the quantities that depend on this field, or
+        everything if None.
+
+        """
+        if field is None:
+            clear_cached_properties(self)
+        else:
+            clear_cached_properties(
+                self,
+                [
+                    name
+                    for name, deps in self.CACHE_DEPENDENCIES.items()
+                    if field in deps
+                ],
+            )
 
     @computed_field
+    @cached_property
     def parameters(self) -> ParameterSet:
         """Add the parameters field."""
         return ParameterSet(
@@ -35,35 +149,96 @@ class MaudInput(BaseModel):
             init_input=self.init_input,
         )
 
+    @cached_property
+    def measurement_table(self) -> MeasurementTable:
+        """Get all the experiments' measurements as one MeasurementTable."""
+        return get_experiments_measurement_table(self.experiments)
+
+    @cached_property
+    def network_properties_input(self) -> Dict:
+        """Get the Stan inputs that describe the kinetic model."""
+        return get_network_properties_input(self.kinetic_model, self.parameters)
+
+    @cached_property
+    def fixed_param_input(self) -> Dict:
+        """Get the Stan inputs that describe fixed parameters."""
+        return get_fixed_param_input(self.parameters, self.kinetic_model)
+
+    @cached_property
+    def kinetic_prior_inputs(self) -> Tuple[Dict, Dict]:
+        """Get the priors that do not depend on the experiments."""
+        return get_prior_inputs(
+            self.parameters,
+            set(ParameterSet.model_computed_fields)
+            - ParameterSet.EXPERIMENT_DEPENDENT,
+        )
+
+    @cached_property
+    def experiment_prior_inputs(self) -> Tuple[Dict, Dict]:
+        """Get the priors that depend on the experiments."""
+        return get_prior_inputs(
+            self.parameters, ParameterSet.EXPERIMENT_DEPENDENT
+        )
+
+    @cached_property
+    def experiments_input(self) -> Tuple[Dict, Dict]:
+        """Get the Stan inputs that describe the experiments."""
+        return get_experiments_input(
+            self.experiments, self.kinetic_model, self.measurement_table
+        )
+
+    @cached_property
+    def config_input(self) -> Dict:
+        """Get the Stan inputs that come from the config."""
+        return get_config_input(self.config)
+
+    @cached_property
+    def conc_init(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Get the initial concentrations for the ODE solver."""
+        return get_conc_init(
+            self.experiments,
+            self.kinetic_model,
+            self.config,
+            self.measurement_table,
+        )
+
+    @cached_property
+    def stan_inputs(self) -> Tuple[Dict, Dict]:
+        """Get the train and test Stan inputs together."""
+        return combine_stan_inputs(
+            network_properties_input=self.network_properties_input,
+            fixed_param_input=self.fixed_param_input,
+            prior_inputs=[
+                self.kinetic_prior_inputs,
+                self.experiment_prior_inputs,
+            ],
+            experiments_input=self.experiments_input,
+            config_input=self.config_input,
+            conc_init=self.conc_init,
+        )
+
     @computed_field
+    @cached_property
     def stan_input_train(self) -> Dict:
         """Add the stan_input_train field."""
-        train, _ = get_stan_inputs(
-            parameters=self.parameters,
-            experiments=self.experiments,
-            kinetic_model=self.kinetic_model,
-            config=self.config,
-        )
+        train, _ = self.stan_inputs
         return train
 
     @computed_field
+    @cached_property
     def stan_input_test(self) -> Dict:
         """Add the stan_input_test field."""
-        _, test = get_stan_inputs(
-            parameters=self.parameters,
-            experiments=self.experiments,
-            kinetic_model=self.kinetic_model,
-            config=self.config,
-        )
+        _, test = self.stan_inputs
         return test
 
     @computed_field
+    @cached_property
     def inits_dict(self) -> Dict:
         """Add the inits_dict field."""
         inits_dict = {}
         params = [
             getattr(self.parameters, p)
-            for p in self.parameters.dict().keys()
+            for p in type(self.parameters).model_computed_fields.keys()
             if isinstance(getattr(self.parameters, p), MaudParameter)
         ]
         for param in params:
@@ -77,11 +252,14 @@ class MaudInput(BaseModel):
                 met_to_init = dict(
                     zip(param.inits.ids[0], param.inits.inits_unscaled)
                 )
+                fixed_ids = set(param.fixed_ids[0])
                 inits_dict[param.name + "_free"] = [
                     init
                     for met, init in met_to_init.items()
-                    if met not in param.fixed_ids[0]
+                    if met not in fixed_ids
                 ]
             elif param.fixable:
-                inits_dict[param.name + "_free"] = param.inits.inits_unscaled
+                inits_dict[param.name + "_free"] = list(
+                    param.inits.inits_unscaled
+                )
         return inits_dict
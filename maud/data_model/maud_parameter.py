@@ -1,11 +1,12 @@
 """Provides model MaudParameter, and subclasses for all parameters Maud uses."""
 
 from copy import deepcopy
+from functools import cached_property
 from typing import List, Optional, Union
 
 from pydantic import BaseModel, computed_field, field_validator, model_validator
 
-from maud.data_model.experiment import Measurement
+from maud.data_model.experiment import MeasurementTable
 from maud.data_model.hardcoding import ID_SEPARATOR
 from maud.data_model.id_component import IdComponent
 from maud.data_model.maud_init import Init, Init1d, Init2d, InitAtomInput
@@ -32,9 +33,10 @@ class MaudParameter(BaseModel):
     ids: List[List[str]]
     split_ids: List[List[List[str]]]
     fixable: bool = False
-    measurements: Optional[List[Measurement]] = None
+    measurements: Optional[MeasurementTable] = None
 
     @computed_field
+    @cached_property
     def fixed_ids(self) -> Optional[List[List[str]]]:
         """Set the fixed_ids field."""
         if not self.fixable:
@@ -59,6 +61,7 @@ class MaudParameter(BaseModel):
             raise ValueError(f"Something wrong with input {self.user_input}")
 
     @computed_field
+    @cached_property
     def fixed_values(self) -> Optional[List[List[float]]]:
         """Set the fixed_values field."""
         if not self.fixable:
@@ -80,6 +83,7 @@ class MaudParameter(BaseModel):
             raise ValueError(f"Something wrong with input {self.user_input}")
 
     @computed_field
+    @cached_property
     def prior(self) -> Union[IndPrior1d, IndPrior2d, PriorMVN]:
         """Return a prior, calculated from the user input."""
         if self.name == "dgf":
@@ -98,6 +102,7 @@ class MaudParameter(BaseModel):
         )
 
     @computed_field
+    @cached_property
     def inits(self) -> Init:
         """Add the inits field."""
         initialiser = Init1d if len(self.shape_names) == 1 else Init2d
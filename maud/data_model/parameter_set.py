@@ -4,25 +4,82 @@ This is where logic for constructing MaudParameter objects should live.
 
 """
 
+from functools import cached_property
+from typing import Any, ClassVar, FrozenSet, Optional
+
 from pydantic import BaseModel, computed_field
 
 import maud.data_model.maud_parameter as mp
-from maud.data_model.experiment import Experiment, Measurement, MeasurementType
+from maud.data_model.experiment import (
+    Experiment,
+    MeasurementTable,
+    MeasurementType,
+    get_experiments_measurement_table,
+)
 from maud.data_model.hardcoding import ID_SEPARATOR
 from maud.data_model.kinetic_model import KineticModel, ReactionMechanism
 from maud.data_model.maud_init import InitInput
 from maud.data_model.parameter_input import ParameterSetInput
+from maud.utility_functions import clear_cached_properties
 
 
 class ParameterSet(BaseModel):
-    """the parameters of a maud input."""
+    """the parameters of a maud input.
+
+    Parameters are created when they are first needed and then cached.
+    Assigning to experiments only clears the parameters whose shape depends on
+    the experiments; assigning to any other field clears everything.
+
+    """
 
     kinetic_model: KineticModel
     experiments: list[Experiment]
     parameter_set_input: ParameterSetInput
     init_input: InitInput
+    EXPERIMENT_DEPENDENT: ClassVar[FrozenSet[str]] = frozenset(
+        [
+            "measurement_table",
+            "drain_train",
+            "drain_test",
+            "conc_enzyme_train",
+            "conc_enzyme_test",
+            "conc_moiety_pool_train",
+            "conc_moiety_pool_test",
+            "conc_unbalanced_train",
+            "conc_unbalanced_test",
+            "conc_pme_train",
+            "conc_pme_test",
+            "psi_train",
+            "psi_test",
+        ]
+    )
+
+    def __setattr__(self, name, value):
+        """Set an attribute, clearing the cache if it is a field."""
+        super().__setattr__(name, value)
+        if name == "experiments":
+            clear_cached_properties(self, self.EXPERIMENT_DEPENDENT)
+        elif name in type(self).model_fields:
+            self.clear_cache()
+
+    def model_copy(
+        self, *, update: Optional[dict[str, Any]] = None, deep: bool = False
+    ) -> "ParameterSet":
+        """Copy the model, clearing the cache entries that depend on update."""
+        copied = super().model_copy(update=update, deep=deep)
+        if update is not None and set(update) & set(type(self).model_fields):
+            if set(update) <= {"experiments"}:
+                clear_cached_properties(copied, self.EXPERIMENT_DEPENDENT)
+            else:
+                copied.clear_cache()
+        return copied
+
+    def clear_cache(self) -> None:
+        """Forget all cached parameters."""
+        clear_cached_properties(self)
 
     @computed_field
+    @cached_property
     def dgf(self) -> mp.Dgf:
         """Add the dgf field."""
         metabolite_ids = [m.id for m in self.kinetic_model.metabolites]
@@ -34,6 +91,7 @@ class ParameterSet(BaseModel):
         )
 
     @computed_field
+    @cached_property
     def km(self) -> mp.Km:
         """Add the km field."""
         ids = []
@@ -41,14 +99,10 @@ class ParameterSet(BaseModel):
         mets = []
         cpts = []
         for er in self.kinetic_model.ers:
-            rxn = [
-                r
-                for r in self.kinetic_model.reactions
-                if r.id == er.reaction_id
-            ][0]
-            enz = [
-                e for e in self.kinetic_model.enzymes if e.id == er.enzyme_id
-            ][0]
+            rxn = self.kinetic_model.get_reaction(er.reaction_id)
+            enz = self.kinetic_model.enzymes[
+                self.kinetic_model.enzyme_index[er.enzyme_id]
+            ]
             mic_ids = (
                 list(rxn.stoichiometry.keys())
                 if rxn.mechanism
@@ -71,6 +125,7 @@ class ParameterSet(BaseModel):
         )
 
     @computed_field
+    @cached_property
     def ki(self) -> mp.Ki:
         """Add the ki field."""
         ids = []
@@ -93,6 +148,7 @@ class ParameterSet(BaseModel):
         )
 
     @computed_field
+    @cached_property
     def kcat(self) -> mp.Kcat:
         """Add the kcat field."""
         ids = []
@@ -110,6 +166,7 @@ class ParameterSet(BaseModel):
         )
 
     @computed_field
+    @cached_property
     def dissociation_constant(self) -> mp.DissociationConstant:
         """Add the dissociation_constant field."""
         ids = []
@@ -132,6 +189,7 @@ class ParameterSet(BaseModel):
         )
 
     @computed_field
+    @cached_property
     def transfer_constant(self) -> mp.TransferConstant:
         """Add the transfer_constant field."""
         allosteric_enzyme_ids = (
@@ -147,6 +205,7 @@ class ParameterSet(BaseModel):
         )
 
     @computed_field
+    @cached_property
     def kcat_pme(self) -> mp.KcatPme:
         """Add the kcat_pme field."""
         phos_modifying_enzymes = (
@@ -184,24 +243,30 @@ class ParameterSet(BaseModel):
         return result if train else result.test()
 
     @computed_field
+    @cached_property
     def drain_train(self) -> mp.Drain:
         """Add the drain_train field."""
         return self._get_drain(train=True)
 
     @computed_field
+    @cached_property
     def drain_test(self) -> mp.Drain:
         """Add the drain_test field."""
         return self._get_drain(train=False)
 
+    @cached_property
+    def measurement_table(self) -> MeasurementTable:
+        """Get all the experiments' measurements as one MeasurementTable."""
+        return get_experiments_measurement_table(self.experiments)
+
     def _get_measurements(
         self, train: bool, mtype: MeasurementType
-    ) -> list[Measurement]:
-        return [
-            m
-            for e in self.experiments
-            for m in e.measurements
-            if (e.is_train if train else e.is_test) and m.target_type == mtype
-        ]
+    ) -> MeasurementTable:
+        table = self.measurement_table
+        exp_ids = self._get_experiments(train)
+        return table.select(
+            table.is_type(mtype) & table.in_experiments(exp_ids)
+        )
 
     def _get_conc_enzyme(self, train: bool) -> mp.ConcEnzyme:
         enzyme_ids = [e.id for e in self.kinetic_model.enzymes]
@@ -217,11 +282,13 @@ class ParameterSet(BaseModel):
         return result if train else result.test()
 
     @computed_field
+    @cached_property
     def conc_enzyme_train(self) -> mp.ConcEnzyme:
         """Add the conc_enzyme_train field."""
         return self._get_conc_enzyme(train=True)
 
     @computed_field
+    @cached_property
     def conc_enzyme_test(self) -> mp.ConcEnzyme:
         """Add the conc_enzyme_test field."""
         return self._get_conc_enzyme(train=False)
@@ -243,11 +310,13 @@ class ParameterSet(BaseModel):
             return []
 
     @computed_field
+    @cached_property
     def conc_moiety_pool_train(self) -> mp.ConservedMoiety:
         """Add the conc_enzyme_train field."""
         return self._get_conc_moiety_pool(train=True)
 
     @computed_field
+    @cached_property
     def conc_moiety_pool_test(self) -> mp.ConservedMoiety:
         """Add the conc_enzyme_test field."""
         return self._get_conc_moiety_pool(train=False)
@@ -278,11 +347,13 @@ class ParameterSet(BaseModel):
         return result if train else result.test()
 
     @computed_field
+    @cached_property
     def conc_unbalanced_train(self) -> mp.ConcUnbalanced:
         """Add the conc_unbalanced_train field."""
         return self._get_conc_unbalanced(train=True)
 
     @computed_field
+    @cached_property
     def conc_unbalanced_test(self) -> mp.ConcUnbalanced:
         """Add the conc_unbalanced_test field."""
         return self._get_conc_unbalanced(train=False)
@@ -304,11 +375,13 @@ class ParameterSet(BaseModel):
         return result if train else result.test()
 
     @computed_field
+    @cached_property
     def conc_pme_train(self) -> mp.ConcPme:
         """Add the conc_pme_train field."""
         return self._get_conc_pme(train=True)
 
     @computed_field
+    @cached_property
     def conc_pme_test(self) -> mp.ConcPme:
         """Add the conc_pme_test field."""
         return self._get_conc_pme(train=False)
@@ -329,11 +402,13 @@ class ParameterSet(BaseModel):
         return result if train else result.test()
 
     @computed_field
+    @cached_property
     def psi_train(self) -> mp.Psi:
         """Add the psi_train field."""
         return self._get_psi(train=True)
 
     @computed_field
+    @cached_property
     def psi_test(self) -> mp.Psi:
         """Add the psi_test field."""
         return self._get_psi(train=False)
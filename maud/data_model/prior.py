@@ -1,13 +1,15 @@
 """Definitions of priors."""
 
 import math
-from typing import List, Optional, Union
+from functools import cached_property
+from typing import Dict, List, Optional, Tuple, Union
 
 import numpy as np
 import pandas as pd
 from numpy.linalg import LinAlgError
 from pydantic import (
     BaseModel,
+    ConfigDict,
     NonNegativeFloat,
     PositiveFloat,
     computed_field,
@@ -61,8 +63,57 @@ def get_pia_scale(pia: ParameterInputAtom, non_negative: bool) -> float:
         raise ValueError(f"Incorrectly specified Prior input atom: {pia}")
 
 
+def get_user_prior_values(
+    user_input: Optional[List[ParameterInputAtom]],
+    id_components: List[List[IdComponent]],
+    index: List[Dict[str, int]],
+    non_negative: bool,
+) -> Tuple[List[Tuple[int, ...]], List[float], List[float]]:
+    """Get the positions, locations and scales that a user specified.
+
+    :param user_input: the user's parameter input atoms, if any
+    :param id_components: the id components for each dimension
+    :param index: a map from id to position for each dimension
+    :param non_negative: whether the parameter is non-negative
+
+    Atoms whose ids are not in the index are ignored. If an id is specified
+    more than once, the last specification wins.
+
+    """
+    if user_input is None:
+        return [], [], []
+    positions: Dict[Tuple[int, ...], ParameterInputAtom] = {}
+    for pia in user_input:
+        ids_i = [
+            ID_SEPARATOR.join([getattr(pia, c) for c in idci])
+            for idci in id_components
+        ]
+        if all(id_i in ix for id_i, ix in zip(ids_i, index)):
+            positions[tuple(ix[id_i] for id_i, ix in zip(ids_i, index))] = pia
+    locs = [get_pia_loc(pia, non_negative) for pia in positions.values()]
+    scales = [get_pia_scale(pia, non_negative) for pia in positions.values()]
+    return list(positions.keys()), locs, scales
+
+
+def check_location_and_scale(location: np.ndarray, scale: np.ndarray):
+    """Check that a location and scale array are valid."""
+    if location.shape != scale.shape:
+        raise ValueError("Location, scale and ids must have the same length.")
+    if np.isnan(location).any():
+        raise ValueError("Location cannot be null.")
+    if np.isnan(scale).any():
+        raise ValueError("Scale cannot be null.")
+    if (scale <= 0).any():
+        raise ValueError("Scale parameter must be positive.")
+
+
 class IndPrior1d(BaseModel):
-    """Independent location/scale prior for a 1D parameter."""
+    """Independent location/scale prior for a 1D parameter.
+
+    The location and scale are built once, using a map from id to position,
+    and cached as numpy arrays.
+
+    """
 
     user_input: Optional[List[ParameterInputAtom]]
     ids: List[List[str]]
@@ -70,78 +121,52 @@ class IndPrior1d(BaseModel):
     non_negative: bool
     default_loc: float
     default_scale: PositiveFloat
+    model_config: ConfigDict = {"arbitrary_types_allowed": True}
+
+    @cached_property
+    def location_and_scale(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Get the location and scale arrays."""
+        ids = self.ids[0]
+        location = np.full(len(ids), self.default_loc, dtype=float)
+        scale = np.full(len(ids), self.default_scale, dtype=float)
+        positions, locs, scales = get_user_prior_values(
+            self.user_input,
+            self.id_components,
+            [dict(zip(ids, range(len(ids))))],
+            self.non_negative,
+        )
+        if len(positions) > 0:
+            ix = np.array(positions)[:, 0]
+            location[ix] = locs
+            scale[ix] = scales
+        return location, scale
 
     @computed_field
-    def location(self) -> List[float]:
+    @cached_property
+    def location(self) -> np.ndarray:
         """Add the location field."""
-        if len(self.ids[0]) == 0:
-            return []
-        loc_series = pd.Series(self.default_loc, index=self.ids)
-        if self.user_input is not None:
-            for pia in self.user_input:
-                loc_i = get_pia_loc(pia, non_negative=self.non_negative)
-                ids_i = [
-                    ID_SEPARATOR.join([getattr(pia, c) for c in idci])
-                    for idci in self.id_components
-                ]
-                if ids_i[0] in loc_series.index:
-                    loc_series.loc[ids_i[0]] = loc_i
-        return loc_series.tolist()
+        return self.location_and_scale[0]
 
     @computed_field
-    def scale(self) -> List[PositiveFloat]:
+    @cached_property
+    def scale(self) -> np.ndarray:
         """Add the scale field."""
-        if len(self.ids[0]) == 0:
-            return []
-        scale_series = pd.Series(self.default_scale, index=self.ids)
-        if self.user_input is not None:
-            for pia in self.user_input:
-                scale_i = get_pia_scale(pia, non_negative=self.non_negative)
-                ids_i = [
-                    ID_SEPARATOR.join([getattr(pia, c) for c in idci])
-                    for idci in self.id_components
-                ]
-                if ids_i[0] in scale_series.index:
-                    scale_series.loc[ids_i[0]] = scale_i
-        return scale_series.tolist()
-
-    @field_validator("location")
-    def no_null_locations(cls, v):
-        """Check that locations are non-null."""
-        for x in v:
-            if math.isnan(x):
-                raise ValueError("Location cannot be null.")
-        return v
-
-    @field_validator("scale")
-    def no_null_scales(cls, v):
-        """Check that scales are non-null."""
-        for x in v:
-            if math.isnan(x):
-                raise ValueError("Scale cannot be null.")
-        return v
-
-    @field_validator("scale")
-    def scales_are_positive(cls, v):
-        """Check that scales are positive."""
-        if len(v) > 0 and any(x <= 0 for x in v):
-            raise ValueError("Scale parameter must be positive.")
-        return v
+        return self.location_and_scale[1]
 
     @model_validator(mode="after")
-    def lengths_match(self):
-        """Check that location and scale have the same index."""
-        n_locs = len(self.location)
-        n_scales = len(self.scale)
-        if n_locs != n_scales:
-            raise ValueError(
-                "Location, scale and ids must have the same length."
-            )
+    def location_and_scale_are_valid(self):
+        """Check that location and scale are valid."""
+        check_location_and_scale(self.location, self.scale)
         return self
 
 
 class IndPrior2d(BaseModel):
-    """Independent location/scale prior for a 2D parameter."""
+    """Independent location/scale prior for a 2D parameter.
+
+    The location and scale are built once, using a map from id to position
+    for each dimension, and cached as numpy arrays.
+
+    """
 
     user_input: Optional[List[ParameterInputAtom]]
     ids: List[List[str]]
@@ -149,81 +174,44 @@ class IndPrior2d(BaseModel):
     non_negative: bool
     default_loc: float
     default_scale: PositiveFloat
+    model_config: ConfigDict = {"arbitrary_types_allowed": True}
 
-    @computed_field
-    def location(self) -> List[List[float]]:
-        """Add the location field."""
+    @cached_property
+    def location_and_scale(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Get the location and scale arrays."""
         if any(len(ids_i) == 0 for ids_i in self.ids):
-            return [[]]
-        loc_df = pd.DataFrame(
-            self.default_loc, index=self.ids[0], columns=self.ids[1]
+            return np.empty((1, 0)), np.empty((1, 0))
+        shape = (len(self.ids[0]), len(self.ids[1]))
+        location = np.full(shape, self.default_loc, dtype=float)
+        scale = np.full(shape, self.default_scale, dtype=float)
+        positions, locs, scales = get_user_prior_values(
+            self.user_input,
+            self.id_components,
+            [dict(zip(ids_i, range(len(ids_i)))) for ids_i in self.ids[:2]],
+            self.non_negative,
         )
-        if self.user_input is not None:
-            for pia in self.user_input:
-                loc_i = get_pia_loc(pia, non_negative=self.non_negative)
-                ids_i = [
-                    ID_SEPARATOR.join([getattr(pia, c) for c in idci])
-                    for idci in self.id_components
-                ]
-                if ids_i[0] in loc_df.index and ids_i[1] in loc_df.columns:
-                    loc_df.loc[ids_i[0], ids_i[1]] = loc_i
-        return loc_df.values.tolist()
+        if len(positions) > 0:
+            rows, cols = np.array(positions).T
+            location[rows, cols] = locs
+            scale[rows, cols] = scales
+        return location, scale
 
     @computed_field
-    def scale(self) -> List[List[PositiveFloat]]:
-        """Add the scale field."""
-        if any(len(ids_i) == 0 for ids_i in self.ids):
-            return [[]]
-        scale_df = pd.DataFrame(
-            self.default_scale, index=self.ids[0], columns=self.ids[1]
-        )
-        if self.user_input is not None:
-            for pia in self.user_input:
-                scale_i = get_pia_scale(pia, non_negative=self.non_negative)
-                ids_i = [
-                    ID_SEPARATOR.join([getattr(pia, c) for c in idci])
-                    for idci in self.id_components
-                ]
-                if ids_i[0] in scale_df.index and ids_i[1] in scale_df.columns:
-                    scale_df.loc[ids_i[0], ids_i[1]] = scale_i
-        return scale_df.values.tolist()
-
-    @field_validator("location")
-    def no_null_locations(cls, v):
-        """Check that locations are non-null."""
-        for vi in v:
-            for x in vi:
-                if math.isnan(x):
-                    raise ValueError("Location cannot be null.")
-        return v
-
-    @field_validator("scale")
-    def no_null_scales(cls, v):
-        """Check that scales are non-null."""
-        for vi in v:
-            for x in vi:
-                if math.isnan(x):
-                    raise ValueError("Scale cannot be null.")
-        return v
+    @cached_property
+    def location(self) -> np.ndarray:
+        """Add the location field."""
+        return self.location_and_scale[0]
 
-    @field_validator("scale")
-    def scales_are_positive(cls, v):
-        """Check that scales are all positive."""
-        for s in v:
-            if len(s) > 0 and any(x <= 0 for x in s):
-                raise ValueError("Scale parameter must be positive.")
-        return v
+    @computed_field
+    @cached_property
+    def scale(self) -> np.ndarray:
+        """Add the scale field."""
+        return self.location_and_scale[1]
 
     @model_validator(mode="after")
-    def lengths_are_correct(self):
-        """Check that ids, location and scale have correct length."""
-        loc = self.location
-        scale = self.scale
-        if not len(loc) == len(scale):
-            raise ValueError("First dimension length incorrect.")
-        for i, (loc_i, scale_i) in enumerate(zip(loc, scale)):
-            if not len(loc_i) == len(scale_i):
-                raise ValueError(f"Length mismatch at index {i}.")
+    def location_and_scale_are_valid(self):
+        """Check that location and scale are valid."""
+        check_location_and_scale(self.location, self.scale)
         return self
 
 
@@ -1,96 +1,17 @@
 """Functions for creating InferenceData objects from Maud outputs."""
 
-from typing import List
+from typing import List, Union
 
 import arviz as az
 
-from maud.data_model.experiment import MeasurementType
-from maud.data_model.hardcoding import ID_SEPARATOR
+from maud.data_model.maud_bundle import MaudBundle, get_coords
 from maud.data_model.maud_input import MaudInput
 
 
-def get_idata(csvs: List[str], mi: MaudInput, mode: str) -> az.InferenceData:
+def get_idata(
+    csvs: List[str], mi: Union[MaudInput, MaudBundle], mode: str
+) -> az.InferenceData:
     """Get an arviz InferenceData object from Maud csvs."""
-    experiments = (
-        [e for e in mi.experiments if e.is_train]
-        if mode == "train"
-        else [e for e in mi.experiments if e.is_test]
-    )
-    yconc_coords, yflux_coords, yenz_coords = (
-        [
-            f"{e.id}{ID_SEPARATOR}{m.target_id}"
-            for e in experiments
-            for m in e.measurements
-            if m.target_type == t
-        ]
-        for t in [
-            MeasurementType.MIC,
-            MeasurementType.FLUX,
-            MeasurementType.ENZYME,
-        ]
-    )
-    dependent_mics = (
-        [m.solve for m in mi.kinetic_model.conserved_moiety]
-        if mi.kinetic_model.conserved_moiety is not None
-        else []
-    )
-    coords = {
-        "enzymes": [e.id for e in mi.kinetic_model.enzymes],
-        "experiments": [e.id for e in experiments],
-        "reactions": [r.id for r in mi.kinetic_model.reactions],
-        "drains": [r.id for r in mi.kinetic_model.drains],
-        "metabolites": [m.id for m in mi.kinetic_model.metabolites],
-        "mics": [m.id for m in mi.kinetic_model.mics],
-        "conserved_moieties": (
-            [cm.id for cm in mi.kinetic_model.conserved_moiety]
-            if mi.kinetic_model.conserved_moiety is not None
-            else []
-        ),
-        "edges": [e.id for e in mi.kinetic_model.edges],
-        "edges1": [e.id for e in mi.kinetic_model.edges],
-        "unbalanced_mics": [
-            m.id for m in mi.kinetic_model.mics if not m.balanced
-        ],
-        "independent_mics": [
-            m.id
-            for m in mi.kinetic_model.mics
-            if (m.balanced) & (m.id not in dependent_mics)
-        ],
-        "phosphorylations": (
-            [p.id for p in mi.kinetic_model.phosphorylations]
-            if mi.kinetic_model.phosphorylations is not None
-            else []
-        ),
-        "phosphorylation_modifying_enzymes": (
-            [
-                pme.id
-                for pme in mi.kinetic_model.phosphorylation_modifying_enzymes
-            ]
-            if mi.kinetic_model.phosphorylation_modifying_enzymes is not None
-            else []
-        ),
-        "allosteries": (
-            [p.id for p in mi.kinetic_model.allosteries]
-            if mi.kinetic_model.allosteries is not None
-            else []
-        ),
-        "allosteric_enzymes": (
-            [e.id for e in mi.kinetic_model.allosteric_enzymes]
-            if mi.kinetic_model.allosteric_enzymes is not None
-            else []
-        ),
-        "competitive_inhibitions": (
-            [p.id for p in mi.kinetic_model.competitive_inhibitions]
-            if mi.kinetic_model.competitive_inhibitions is not None
-            else []
-        ),
-        "kms": mi.parameters.km.ids[0],
-        "kis": mi.parameters.ki.ids[0],
-        "dissociation_constants": (mi.parameters.dissociation_constant.ids[0]),
-        "yconcs": yconc_coords,
-        "yfluxs": yflux_coords,
-        "yenz": yenz_coords,
-    }
     dims = {
         f"flux_{mode}": ["experiments", "reactions"],
         f"conc_{mode}": ["experiments", "mics"],
@@ -150,7 +71,7 @@ def get_idata(csvs: List[str], mi: MaudInput, mode: str) -> az.InferenceData:
     #     dims[f"log_{zvar}_z"] = dims[zvar]
     return az.from_cmdstan(
         posterior=csvs,
-        coords=coords,
+        coords=get_coords(mi, mode),
         log_likelihood=[f"llik_conc_{mode}", f"llik_flux_{mode}"],
         posterior_predictive=[f"yrep_conc_{mode}", f"yrep_flux_{mode}"],
         dims=dims,
@@ -1,11 +1,20 @@
 """Provides function get_stan_inputs for generating Stan input dictionaries."""
 
-from typing import Dict, Iterable, List, Tuple, Union
+from functools import reduce
+from itertools import chain
+from operator import or_
+from typing import Dict, Iterable, List, Optional, Tuple, Union
 
+import numpy as np
 import pandas as pd
-from scipy.stats import gmean
+from scipy import sparse
 
-from maud.data_model.experiment import Experiment, MeasurementType
+from maud.data_model.experiment import (
+    Experiment,
+    MeasurementTable,
+    MeasurementType,
+    get_experiments_measurement_table,
+)
 from maud.data_model.hardcoding import ID_SEPARATOR
 from maud.data_model.kinetic_model import (
     Allostery,
@@ -21,7 +30,11 @@ from maud.data_model.kinetic_model import (
     Reaction,
     ReactionMechanism,
 )
-from maud.data_model.maud_config import MaudConfig
+from maud.data_model.maud_config import (
+    MaudConfig,
+    ODESolverConfig,
+    SteadyStateSolver,
+)
 from maud.data_model.maud_parameter import MaudParameter
 from maud.data_model.parameter_set import ParameterSet
 from maud.data_model.prior import PriorMVN
@@ -32,6 +45,7 @@ def get_stan_inputs(
     experiments: List[Experiment],
     kinetic_model: KineticModel,
     config: MaudConfig,
+    measurement_table: Optional[MeasurementTable] = None,
 ) -> Tuple[Dict, Dict]:
     """Get inputs to model.stan and prediction_model.stan.
 
@@ -39,20 +53,45 @@ def get_stan_inputs(
     :param priors: a PriorSet object
     :param kinetic_model: a KineticModel object
     :param config: a MaudConfig object
+    :param measurement_table: the experiments' measurements, if already known
 
     """
-    network_properties_input = get_network_properties_input(
-        kinetic_model, parameters
-    )
-    fixed_param_input = get_fixed_param_input(parameters, kinetic_model)
-    priors_input_train, priors_input_test = get_prior_inputs(parameters)
-    experiments_input_train, experiments_input_test = get_experiments_input(
-        experiments, kinetic_model
+    if measurement_table is None:
+        measurement_table = get_experiments_measurement_table(experiments)
+    return combine_stan_inputs(
+        network_properties_input=get_network_properties_input(
+            kinetic_model, parameters
+        ),
+        fixed_param_input=get_fixed_param_input(parameters, kinetic_model),
+        prior_inputs=[get_prior_inputs(parameters)],
+        experiments_input=get_experiments_input(
+            experiments, kinetic_model, measurement_table
+        ),
+        config_input=get_config_input(config),
+        conc_init=get_conc_init(
+            experiments, kinetic_model, config, measurement_table
+        ),
     )
-    config_input = get_config_input(config)
-    conc_init_train, conc_init_test = get_conc_init(
-        experiments, kinetic_model, config
+
+
+def combine_stan_inputs(
+    network_properties_input: Dict,
+    fixed_param_input: Dict,
+    prior_inputs: List[Tuple[Dict, Dict]],
+    experiments_input: Tuple[Dict, Dict],
+    config_input: Dict,
+    conc_init: Tuple[np.ndarray, np.ndarray],
+) -> Tuple[Dict, Dict]:
+    """Put the separately computed parts of the Stan inputs together.
+
+    Each tuple argument contains a train part and a test part.
+
+    """
+    priors_input_train, priors_input_test = (
+        reduce(or_, parts, {}) for parts in zip(*prior_inputs)
     )
+    experiments_input_train, experiments_input_test = experiments_input
+    conc_init_train, conc_init_test = conc_init
     return (
         network_properties_input
         | fixed_param_input
@@ -93,12 +132,21 @@ def get_fixed_param_input(
         }
 
 
-def get_prior_inputs(parameters: ParameterSet) -> Tuple[Dict, Dict]:
-    """Get the priors component of an input to Maud's Stan model."""
+def get_prior_inputs(
+    parameters: ParameterSet, names: Optional[Iterable[str]] = None
+) -> Tuple[Dict, Dict]:
+    """Get the priors component of an input to Maud's Stan model.
+
+    :param parameters: a ParameterSet object
+    :param names: the parameters to include, or None to include all of them
+
+    """
+    computed_fields = type(parameters).model_computed_fields.keys()
+    names = computed_fields if names is None else names
     params = [
         getattr(parameters, p)
-        for p in parameters.model_computed_fields.keys()
-        if isinstance(getattr(parameters, p), MaudParameter)
+        for p in computed_fields
+        if p in names and isinstance(getattr(parameters, p), MaudParameter)
     ]
     ind_priors_train = {
         f"priors_{p.name}": [p.prior.location, p.prior.scale]
@@ -110,6 +158,8 @@ def get_prior_inputs(parameters: ParameterSet) -> Tuple[Dict, Dict]:
         for p in params
         if p.prior_in_test_model and not isinstance(p.prior, PriorMVN)
     }
+    if "dgf" not in names:
+        return (ind_priors_train, ind_priors_test)
     assert hasattr(parameters.dgf.prior, "covariance_matrix")
     dgf_priors = {
         "prior_loc_dgf": parameters.dgf.prior.location,
@@ -125,13 +175,17 @@ def get_network_properties_input(
 
     :param kinetic_model: A KineticModel object
     """
-    S = kinetic_model.stoichiometric_matrix
+    S_sparse = kinetic_model.stoichiometric_matrix_sparse
+    S = S_sparse.toarray()
+    S_csr_w, S_csr_v, S_csr_u = encode_csr(S_sparse)
+    S_transpose_csr_w, S_transpose_csr_v, S_transpose_csr_u = encode_csr(
+        S_sparse.T
+    )
     mics = kinetic_model.mics
     edges = kinetic_model.edges
     allosteries = kinetic_model.allosteries
     enzymes = kinetic_model.enzymes
     reactions = kinetic_model.reactions
-    reaction_by_id = {r.id: r for r in reactions}
     metabolite_codes = codify_maud_object(kinetic_model.metabolites)
     mic_codes = codify_maud_object(mics)
     enzyme_codes = codify_maud_object(enzymes)
@@ -140,23 +194,16 @@ def get_network_properties_input(
     km_codes = dict(zip(km_ids, range(1, len(km_ids) + 1)))
     if len(kinetic_model.left_nullspace) > 0:
         lns_ind = kinetic_model.left_nullspace_independent.values.tolist()
-        dependent_mets = [mic.solve for mic in kinetic_model.conserved_moiety]
-        dep_idx = kinetic_model.left_nullspace[dependent_mets]
-        dep_idx = [
-            dep_idx.index[dep_idx[met] == 1].item() for met in dependent_mets
+        dependent_mic_codes = [
+            mic_codes[mic_id] for mic_id in kinetic_model.dependent_mics
         ]
-        dependent_mets = [dependent_mets[i] for i in dep_idx]
-        dependent_mic_codes = [mic_codes[lns] for lns in dependent_mets]
     else:
         lns_ind = [[]]
         dependent_mic_codes = []
     if allosteries is not None:
+        allosteric_enzyme_id_set = {a.enzyme_id for a in allosteries}
         tc_codes = codify_maud_object(
-            [
-                e
-                for e in enzymes
-                if any(a.enzyme_id == e.id for a in allosteries)
-            ]
+            [e for e in enzymes if e.id in allosteric_enzyme_id_set]
         )
         allostery_codes = codify_maud_object(allosteries)
     else:
@@ -208,7 +255,7 @@ def get_network_properties_input(
     ]
     edge_water_stoichiometry = [
         (
-            reaction_by_id[e.reaction_id].water_stoichiometry
+            kinetic_model.get_reaction(e.reaction_id).water_stoichiometry
             if isinstance(e, EnzymeReaction)
             else 0
         )
@@ -216,17 +263,18 @@ def get_network_properties_input(
     ]
     edge_transported_charge = [
         (
-            reaction_by_id[e.reaction_id].transported_charge
+            kinetic_model.get_reaction(e.reaction_id).transported_charge
             if isinstance(e, EnzymeReaction)
             else 0
         )
         for e in edges
     ]
     mic_met_code = [metabolite_codes[m.metabolite_id] for m in mics]
+    dependent_mic_code_set = set(dependent_mic_codes)
     independent_mic_codes = [
         mic_codes[mic.id]
         for mic in mics
-        if ((mic.balanced) & (mic_codes[mic.id] not in dependent_mic_codes))
+        if ((mic.balanced) & (mic_codes[mic.id] not in dependent_mic_code_set))
     ]
     unbalanced_mic_codes = [
         mic_codes[mic.id] for mic in mics if not mic.balanced
@@ -250,10 +298,7 @@ def get_network_properties_input(
     prod_code_by_edge = []
     prod_km_code_by_edge = []
     for edge in edges:
-        if isinstance(edge, Reaction):  # drain case
-            rxn = edge
-        else:
-            rxn = next(r for r in reactions if r.id == edge.reaction_id)
+        rxn = kinetic_model.get_edge_reaction(edge)
         sub_ids = [
             s for s in rxn.stoichiometry.keys() if rxn.stoichiometry[s] < 0
         ]
@@ -278,17 +323,12 @@ def get_network_properties_input(
         prod_code_by_edge.append([mic_codes[p] for p in prod_ids])
         prod_km_code_by_edge.append([km_codes[k] for k in prod_km_ids])
 
+    # modifiers act on the first edge that their enzyme catalyses
+    edges_by_enzyme = kinetic_model.edges_by_enzyme
     ci_by_edge: List[List[int]] = [[] for er in kinetic_model.edges]
     if kinetic_model.competitive_inhibitions is not None:
         for ci in kinetic_model.competitive_inhibitions:
-            edge_pos = next(
-                i
-                for i, e in enumerate(kinetic_model.edges)
-                if (
-                    isinstance(e, EnzymeReaction)
-                    and e.enzyme_id == ci.enzyme_id
-                )
-            )
+            edge_pos = edges_by_enzyme[ci.enzyme_id][0]
             ci_by_edge[edge_pos].append(ci_codes[ci.id])
     allostery_by_edge: List[List[int]] = [[] for er in kinetic_model.edges]
     if kinetic_model.allosteries is not None:
@@ -300,14 +340,7 @@ def get_network_properties_input(
         ]
         allostery_mic = [mic_codes[a.mic_id] for a in kinetic_model.allosteries]
         for a in kinetic_model.allosteries:
-            edge_pos = next(  # is this right???
-                i
-                for i, er in enumerate(kinetic_model.edges)
-                if (
-                    isinstance(er, EnzymeReaction)
-                    and er.enzyme_id == a.enzyme_id
-                )
-            )
+            edge_pos = edges_by_enzyme[a.enzyme_id][0]  # is this right???
             allostery_by_edge[edge_pos].append(allostery_codes[a.id])
     else:
         allosteric_enzyme_ids = []
@@ -326,14 +359,7 @@ def get_network_properties_input(
             for p in kinetic_model.phosphorylations
         ]
         for p in kinetic_model.phosphorylations:
-            edge_pos = next(
-                i
-                for i, er in enumerate(kinetic_model.edges)
-                if (
-                    isinstance(er, EnzymeReaction)
-                    and er.enzyme_id == p.modified_enzyme_id
-                )
-            )
+            edge_pos = edges_by_enzyme[p.modified_enzyme_id][0]
             phosphorylation_by_edge[edge_pos].append(
                 phosphorylation_codes[p.id]
             )
@@ -358,7 +384,7 @@ def get_network_properties_input(
         "N_pool": len(dependent_mic_codes),
         "N_edge_sub": len(sub_by_edge_long),
         "N_edge_prod": len(prod_by_edge_long),
-        "N_edge": len(S.columns),
+        "N_edge": S.shape[1],
         "N_unbalanced": len(unbalanced_mic_codes),
         "N_independent": len(independent_mic_codes),
         "N_dependent": len(dependent_mic_codes),
@@ -373,7 +399,14 @@ def get_network_properties_input(
         "N_km": len(km_codes),
         "N_sub_km": len(sub_km_ix_by_edge_long),
         "N_prod_km": len(prod_km_ix_by_edge_long),
-        "S": S.values.tolist(),
+        "S": S,
+        "N_S_nonzero": len(S_csr_w),
+        "S_csr_w": S_csr_w,
+        "S_csr_v": S_csr_v,
+        "S_csr_u": S_csr_u,
+        "S_transpose_csr_w": S_transpose_csr_w,
+        "S_transpose_csr_v": S_transpose_csr_v,
+        "S_transpose_csr_u": S_transpose_csr_u,
         "left_nullspace_independent": lns_ind,
         "N_reaction": len(reactions),
         "N_metabolite": len(metabolite_codes),
@@ -413,42 +446,51 @@ def get_network_properties_input(
 
 
 def get_experiments_input(
-    experiments: List[Experiment], kinetic_model: KineticModel
+    experiments: List[Experiment],
+    kinetic_model: KineticModel,
+    measurement_table: Optional[MeasurementTable] = None,
 ):
-    """Get stan input data pertaining to experiments."""
+    """Get stan input data pertaining to experiments.
+
+    :param measurement_table: the experiments' measurements, if already known
+
+    """
+    if measurement_table is None:
+        measurement_table = get_experiments_measurement_table(experiments)
     experiments_train = [e for e in experiments if e.is_train]
     experiments_test = [e for e in experiments if e.is_test]
-    reaction_codes = codify_maud_object(kinetic_model.reactions)
     enzyme_codes = codify_maud_object(kinetic_model.enzymes)
-    mic_codes = codify_maud_object(kinetic_model.mics)
     pme_codes = (
         codify_maud_object(kinetic_model.phosphorylation_modifying_enzymes)
         if kinetic_model.phosphorylation_modifying_enzymes is not None
         else dict()
     )
     experiment_codes_train = codify_maud_object(experiments_train)
-    measurement_types = [
-        MeasurementType.MIC,
-        MeasurementType.ENZYME,
-        MeasurementType.FLUX,
-    ]
-    m_conc_train, m_enz_train, m_flux_train = (
+    measurements_train = measurement_table.select(
+        measurement_table.in_experiments(list(experiment_codes_train))
+    )
+    table_experiment_code_train = np.array(
         [
-            m
-            for e in experiments
-            for m in e.measurements
-            if e.is_train and m.target_type == t
+            experiment_codes_train.get(eid, 0)
+            for eid in measurement_table.experiment_ids
+        ],
+        dtype=int,
+    )
+    m_conc_train, m_enz_train, m_flux_train = (
+        measurements_train.select(measurements_train.is_type(t))
+        for t in [
+            MeasurementType.MIC,
+            MeasurementType.ENZYME,
+            MeasurementType.FLUX,
         ]
-        for t in measurement_types
     )
-    expids_m_conc_train, expids_m_enz_train, expids_m_flux_train = (
-        [
-            e.id
-            for e in experiments
-            for m in e.measurements
-            if e.is_train and m.target_type == t
+    target_ids_conc, target_ids_enz, target_ids_flux = (
+        [x.id for x in xs]
+        for xs in [
+            kinetic_model.mics,
+            kinetic_model.enzymes,
+            kinetic_model.reactions,
         ]
-        for t in measurement_types
     )
     enz_ko_by_experiment_train, enz_ko_by_experiment_test = (
         [
@@ -499,26 +541,24 @@ def get_experiments_input(
         "enzyme_knockout_train_bounds": enz_knockout_bounds_train,
         "pme_knockout_train_long": pme_knockout_long_train,
         "pme_knockout_train_bounds": pme_knockout_bounds_train,
-        "yconc_train": [m.value for m in m_conc_train],
-        "sigma_yconc_train": [m.error_scale for m in m_conc_train],
-        "experiment_yconc_train": [
-            experiment_codes_train[expid] for expid in expids_m_conc_train
-        ],
-        "mic_ix_yconc_train": [mic_codes[m.target_id] for m in m_conc_train],
-        "yflux_train": [m.value for m in m_flux_train],
-        "sigma_yflux_train": [m.error_scale for m in m_flux_train],
-        "experiment_yflux_train": [
-            experiment_codes_train[expid] for expid in expids_m_flux_train
+        "yconc_train": m_conc_train.value,
+        "sigma_yconc_train": m_conc_train.error_scale,
+        "experiment_yconc_train": table_experiment_code_train[
+            m_conc_train.experiment_code
         ],
-        "reaction_yflux_train": [
-            reaction_codes[m.target_id] for m in m_flux_train
+        "mic_ix_yconc_train": m_conc_train.get_target_codes(target_ids_conc),
+        "yflux_train": m_flux_train.value,
+        "sigma_yflux_train": m_flux_train.error_scale,
+        "experiment_yflux_train": table_experiment_code_train[
+            m_flux_train.experiment_code
         ],
-        "yenz_train": [m.value for m in m_enz_train],
-        "sigma_yenz_train": [m.error_scale for m in m_enz_train],
-        "experiment_yenz_train": [
-            experiment_codes_train[expid] for expid in expids_m_enz_train
+        "reaction_yflux_train": m_flux_train.get_target_codes(target_ids_flux),
+        "yenz_train": m_enz_train.value,
+        "sigma_yenz_train": m_enz_train.error_scale,
+        "experiment_yenz_train": table_experiment_code_train[
+            m_enz_train.experiment_code
         ],
-        "enzyme_yenz_train": [enzyme_codes[m.target_id] for m in m_enz_train],
+        "enzyme_yenz_train": m_enz_train.get_target_codes(target_ids_enz),
     }
     input_test = {
         "N_experiment_test": len(experiments_test),
@@ -533,8 +573,17 @@ def get_experiments_input(
     return input_train, input_test
 
 
+STEADY_STATE_SOLVER_CODES = {
+    SteadyStateSolver.ode: 0,
+    SteadyStateSolver.newton: 1,
+    SteadyStateSolver.powell: 2,
+    SteadyStateSolver.ode_checkpoints: 3,
+}
+
+
 def get_config_input(config: MaudConfig):
     """Get Stan input related to algorithm configuration."""
+    ode_checkpoints = get_ode_checkpoints(config.ode_solver_config)
     return {
         "likelihood": int(config.likelihood),
         "drain_small_conc_corrector": config.drain_small_conc_corrector,
@@ -546,78 +595,141 @@ def get_config_input(config: MaudConfig):
         "abs_tol_ode": config.ode_solver_config.abs_tol,
         "timepoint": config.ode_solver_config.timepoint,
         "max_num_steps_ode": config.ode_solver_config.max_num_steps,
+        "log_conc_ode": int(config.ode_solver_config.log_concentration),
         "rel_tol_alg": config.algebra_solver_config.rel_tol,
+        "scaling_step_alg": config.algebra_solver_config.scaling_step,
         "abs_tol_alg": config.algebra_solver_config.abs_tol,
         "max_num_steps_alg": config.algebra_solver_config.max_num_steps,
+        "timepoint_alg": config.algebra_solver_config.timepoint,
+        "steady_state_solver": STEADY_STATE_SOLVER_CODES[
+            config.steady_state_solver
+        ],
+        "N_ode_checkpoint": len(ode_checkpoints),
+        "ode_checkpoints": ode_checkpoints,
+        "grainsize": config.grainsize,
     }
 
 
-def encode_ragged(ragged: List[List]) -> Tuple[List, List]:
-    """Encode a ragged list of lists in a Stan friendly format.
+def get_ode_checkpoints(ode_solver_config: ODESolverConfig) -> List[float]:
+    """Get the times at which to check whether the ODE is at steady state.
 
-    Specifically, the return value is a flat list with all the data, and a list
-    of bounds with the start and end points (1-indexed) of each entry.
+    The checkpoints start at 0, then increase geometrically from
+    first_checkpoint until timepoint, which is always the last one.
 
     """
-    flat: list = []
-    bounds: list = []
-    ticker = 1
-    for sublist in ragged:
-        flat = flat + sublist
-        bounds.append([ticker, ticker + len(sublist) - 1])
-        ticker += len(sublist)
+    timepoint = ode_solver_config.timepoint
+    checkpoints = [0.0]
+    t = ode_solver_config.first_checkpoint
+    while t < timepoint:
+        checkpoints.append(t)
+        t *= ode_solver_config.checkpoint_ratio
+    checkpoints.append(timepoint)
+    return checkpoints
+
+
+def encode_ragged(ragged: List[List[int]]) -> Tuple[np.ndarray, np.ndarray]:
+    """Encode a ragged list of lists of integers in a Stan friendly format.
+
+    Specifically, the return value is a flat integer array with all the data,
+    and an array with one row per entry containing its start and end points
+    (1-indexed). Both can be passed straight to the Stan json writer.
+
+    """
+    lengths = np.fromiter(map(len, ragged), dtype=int, count=len(ragged))
+    flat = np.fromiter(
+        chain.from_iterable(ragged), dtype=int, count=int(lengths.sum())
+    )
+    ends = np.cumsum(lengths)
+    bounds = np.column_stack([ends - lengths + 1, ends])
     return flat, bounds
 
 
+def encode_csr(
+    matrix: sparse.spmatrix,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Encode a sparse matrix in Stan's compressed sparse row format.
+
+    The return values are the non-zero values, their (1-indexed) column
+    indexes and the (1-indexed) positions in the first two arrays where each
+    row starts, i.e. the arguments w, v and u of Stan's function
+    csr_matrix_times_vector.
+
+    """
+    csr = sparse.csr_matrix(matrix, dtype=float)
+    csr.eliminate_zeros()
+    csr.sort_indices()
+    return csr.data, csr.indices.astype(int) + 1, csr.indptr.astype(int) + 1
+
+
 def get_conc_init(
     experiments: List[Experiment],
     kinetic_model: KineticModel,
     config: MaudConfig,
-) -> Tuple[List[List[float]], List[List[float]]]:
+    measurement_table: Optional[MeasurementTable] = None,
+) -> Tuple[np.ndarray, np.ndarray]:
     """Get the initial balanced mic concentrations for the ODE solver.
 
-    The initial concentration for a measured mic is the average measured value.
+    The initial concentration for a measured mic is the geometric mean of its
+    measured and specified initial values, found for all experiments at once
+    by grouping a flat table of log values by experiment and mic.
 
     The initial concentration for an unmeasured mic is the default.
 
+    :param measurement_table: the experiments' measurements, if already known
+
     """
+    if measurement_table is None:
+        measurement_table = get_experiments_measurement_table(experiments)
     default = config.default_initial_concentration
-    balanced_mics = [m for m in kinetic_model.mics if m.balanced]
-    balanced_mic_ids = [m.id for m in balanced_mics]
-    experiment_ids = [exp.id for exp in experiments]
-    experiments_train = [exp.id for exp in experiments if exp.is_train]
-    experiments_test = [exp.id for exp in experiments if exp.is_test]
+    balanced_mic_ids = [m.id for m in kinetic_model.mics if m.balanced]
+    mic_index = dict(zip(balanced_mic_ids, range(len(balanced_mic_ids))))
     if len(kinetic_model.left_nullspace) > 0:
-        dependent_mics = [m.solve for m in kinetic_model.conserved_moiety]
+        dependent_mics = {m.solve for m in kinetic_model.conserved_moiety}
         moiety_groups = [
             mg.moiety_group for mg in kinetic_model.conserved_moiety
         ]
     else:
-        dependent_mics = []
+        dependent_mics = set()
         moiety_groups = []
-    independent_mics = [
-        m.id
-        for m in kinetic_model.mics
-        if (m.balanced) & (m.id not in dependent_mics)
+    independent_cols = [
+        i
+        for i, mic_id in enumerate(balanced_mic_ids)
+        if mic_id not in dependent_mics
     ]
-    inits = pd.DataFrame(
-        default, index=experiment_ids, columns=balanced_mic_ids
+    conc = measurement_table.select(
+        measurement_table.is_type(MeasurementType.MIC)
     )
-    for experiment in experiments:
-        msmts = [
-            m
-            for m in experiment.measurements
-            if m.target_type == MeasurementType.MIC
-        ] + experiment.initial_state
-        for mic in balanced_mics:
-            if any(mic.id == m.target_id for m in msmts):
-                inits.loc[experiment.id, mic.id] = gmean(
-                    [m.value for m in msmts if mic.id == m.target_id]
-                )
+    experiment_index = {e.id: i for i, e in enumerate(experiments)}
+    conc_rows = np.array(
+        [experiment_index.get(eid, -1) for eid in conc.experiment_ids],
+        dtype=int,
+    )[conc.experiment_code]
+    conc_cols = pd.Index(balanced_mic_ids).get_indexer(conc.target_id)
+    initial_rows, initial_cols, initial_values = [], [], []
+    for row, experiment in enumerate(experiments):
+        for ic in experiment.initial_state:
+            if ic.target_id in mic_index:
+                initial_rows.append(row)
+                initial_cols.append(mic_index[ic.target_id])
+                initial_values.append(ic.value)
+    rows = np.concatenate([conc_rows, np.array(initial_rows, dtype=int)])
+    cols = np.concatenate([conc_cols, np.array(initial_cols, dtype=int)])
+    values = np.concatenate([conc.value, np.array(initial_values)])
+    keep = (rows >= 0) & (cols >= 0)
+    shape = (len(experiments), len(balanced_mic_ids))
+    log_sum, count = np.zeros(shape), np.zeros(shape)
+    np.add.at(log_sum, (rows[keep], cols[keep]), np.log(values[keep]))
+    np.add.at(count, (rows[keep], cols[keep]), 1)
+    measured = count > 0
+    inits = np.full(shape, default, dtype=float)
+    inits[measured] = np.exp(log_sum[measured] / count[measured])
     for mg in moiety_groups:
-        inits[mg] = inits[mg].apply(lambda x: x / x.sum(), axis=1)
-    inits_train = inits.loc[experiments_train, independent_mics].values
-    inits_test = inits.loc[experiments_test, independent_mics].values
+        mg_cols = [mic_index[mic_id] for mic_id in mg]
+        inits[:, mg_cols] /= inits[:, mg_cols].sum(axis=1, keepdims=True)
+    rows_train = [i for i, e in enumerate(experiments) if e.is_train]
+    rows_test = [i for i, e in enumerate(experiments) if e.is_test]
+    inits_train = inits[np.ix_(rows_train, independent_cols)]
+    inits_test = inits[np.ix_(rows_test, independent_cols)]
     return inits_train, inits_test
 
 
@@ -1,44 +1,153 @@
 """Provides function load_maud_input."""
 
+import functools
+import hashlib
 import os
+import pickle
+import sys
+import tempfile
+import warnings
+from typing import TYPE_CHECKING, List, Optional, Union
 
-import toml
-
-from maud.data_model.experiment import parse_experiment
+from maud.data_model.experiment import parse_experiment, read_measurement_tables
 from maud.data_model.maud_config import MaudConfig
 from maud.data_model.maud_init import InitInput
 from maud.data_model.maud_input import MaudInput
 from maud.data_model.parameter_input import ParameterSetInput
 from maud.parsing_kinetic_models import parse_kinetic_model
 
+if TYPE_CHECKING:
+    from maud.data_model.maud_bundle import MaudBundle
+
+DEFAULT_CACHE_DIR = os.environ.get(
+    "MAUD_CACHE_DIR",
+    os.path.join(
+        os.environ.get(
+            "XDG_CACHE_HOME", os.path.join(os.path.expanduser("~"), ".cache")
+        ),
+        "maud",
+    ),
+)
+DEFAULT_CACHE_MAX_BYTES = int(2**30)
+CACHE_FORMAT_VERSION = "6"
+
 
-def load_maud_input(data_path: str) -> MaudInput:
+def load_maud_input(
+    data_path: str,
+    cache_dir: Optional[str] = None,
+    cache_max_bytes: int = DEFAULT_CACHE_MAX_BYTES,
+) -> MaudInput:
     """Load an MaudInput object from a data path.
 
-    :param filepath: path to directory containing input toml file
-    :param mode: determines which experiments will be included,
-    defined in the `experimental_setup` as "sample" and/or "predict".
+    If cache_dir is not None, look there for a previously loaded MaudInput
+    with the same input files before parsing anything. Cache entries are
+    keyed by a hash of the files' contents, and include the Stan inputs and
+    inits so that these do not need to be recomputed either.
+
+    :param data_path: path to directory containing input toml files
+    :param cache_dir: directory for cached inputs, or None not to use a cache
+    :param cache_max_bytes: the least recently used cache entries are deleted
+    when the cache gets bigger than this.
+
+    """
+    if cache_dir is None:
+        return parse_maud_input(data_path)
+    cache_path = os.path.join(cache_dir, get_input_hash(data_path) + ".pkl")
+    if os.path.exists(cache_path):
+        try:
+            with open(cache_path, "rb") as f:
+                mi = pickle.load(f)
+            os.utime(cache_path)
+            return mi
+        except Exception as e:
+            warnings.warn(
+                f"Ignoring unreadable cache entry {cache_path}: {e}",
+                stacklevel=2,
+            )
+    mi = parse_maud_input(data_path)
+    # populate the cached properties so they are pickled too
+    _ = (mi.stan_input_train, mi.stan_input_test, mi.inits_dict)
+    write_cache_entry(mi, cache_path)
+    evict_cache_entries(cache_dir, cache_max_bytes)
+    return mi
+
+
+def load_maud_input_from_output(
+    output_path: str, cache_dir: Optional[str] = None
+) -> Union[MaudInput, "MaudBundle"]:
+    """Load the input that produced a Maud output directory.
+
+    If the output has a bundle whose input hash matches the files in its
+    user_input directory, the bundle is returned without parsing the user
+    input at all. Otherwise, e.g. if the user input has been edited since
+    the bundle was written, the user input is loaded and validated as usual
+    and a warning is raised.
+
+    :param output_path: path to a directory written by a Maud command
+    :param cache_dir: passed to load_maud_input if the bundle is not used
+
+    """
+    from maud.data_model.maud_bundle import BUNDLE_FILE_NAME, read_maud_bundle
+
+    bundle_path = os.path.join(output_path, BUNDLE_FILE_NAME)
+    user_input_path = os.path.join(output_path, "user_input")
+    if not os.path.exists(bundle_path):
+        return load_maud_input(user_input_path, cache_dir=cache_dir)
+    try:
+        bundle = read_maud_bundle(bundle_path)
+    except ValueError as e:
+        warnings.warn(f"Validating {user_input_path} again: {e}", stacklevel=2)
+        return load_maud_input(user_input_path, cache_dir=cache_dir)
+    if bundle.input_hash != get_input_hash(user_input_path):
+        warnings.warn(
+            f"Validating {user_input_path} again: its files have changed "
+            f"since {bundle_path} was written.",
+            stacklevel=2,
+        )
+        return load_maud_input(user_input_path, cache_dir=cache_dir)
+    return bundle
+
+
+def parse_maud_input(data_path: str) -> MaudInput:
+    """Parse and validate the files in a Maud input directory.
+
+    :param data_path: path to directory containing input toml files
 
     """
     # get config
     config_path = os.path.join(data_path, "config.toml")
-    config = MaudConfig(**toml.load(config_path))
+    config = MaudConfig(**load_toml(config_path))
     # loading
     kinetic_model_path = os.path.join(data_path, config.kinetic_model_file)
     experiments_path = os.path.join(data_path, config.experiments_file)
-    raw_kinetic_model = toml.load(kinetic_model_path)
+    raw_kinetic_model = load_toml(kinetic_model_path)
     parameter_input_path = os.path.join(data_path, config.priors_file)
     if config.user_inits_file is not None:
         init_input_path = os.path.join(data_path, config.user_inits_file)
-        init_input = InitInput(**toml.load(init_input_path))
+        init_input = InitInput(**load_toml(init_input_path))
     else:
         init_input = InitInput()
+    if config.measurements_file is not None:
+        measurements_path = os.path.join(data_path, config.measurements_file)
+        measurement_tables = read_measurement_tables(measurements_path)
+    else:
+        measurement_tables = {}
     # parsing
     kinetic_model = parse_kinetic_model(raw_kinetic_model)
+    raw_experiments = load_toml(experiments_path)["experiment"]
+    unknown_experiments = set(measurement_tables) - {
+        e["id"] for e in raw_experiments
+    }
+    if len(unknown_experiments) > 0:
+        raise ValueError(
+            f"{config.measurements_file} has measurements for unknown "
+            f"experiments {sorted(unknown_experiments)}."
+        )
     experiments = [
-        parse_experiment(e) for e in toml.load(experiments_path)["experiment"]
+        parse_experiment(e, measurement_tables.get(e["id"]))
+        for e in raw_experiments
     ]
-    parameter_set_input = ParameterSetInput(**toml.load(parameter_input_path))
+    parameter_set_input = ParameterSetInput(**load_toml(parameter_input_path))
     return MaudInput(
         config=config,
         kinetic_model=kinetic_model,
@@ -46,3 +155,110 @@ def load_maud_input(data_path: str) -> MaudInput:
         experiments=experiments,
         init_input=init_input,
     )
+
+
+def load_toml(path: str) -> dict:
+    """Read a toml file, with the standard library's parser if there is one.
+
+    The toml package is used for files that the stricter standard library
+    parser rejects, so that inputs that used to load still do.
+
+    """
+    if sys.version_info >= (3, 11):
+        import tomllib
+
+        with open(path, "rb") as f:
+            try:
+                return tomllib.load(f)
+            except tomllib.TOMLDecodeError:
+                pass
+    import toml
+
+    return toml.load(path)
+
+
+def get_input_files(data_path: str) -> List[str]:
+    """Get the paths of the files that a Maud input directory uses."""
+    config_path = os.path.join(data_path, "config.toml")
+    raw_config = load_toml(config_path)
+    file_keys = [
+        "kinetic_model_file",
+        "priors_file",
+        "experiments_file",
+        "measurements_file",
+        "user_inits_file",
+    ]
+    return [config_path] + [
+        os.path.join(data_path, raw_config[k])
+        for k in file_keys
+        if raw_config.get(k) is not None
+    ]
+
+
+def get_input_hash(data_path: str) -> str:
+    """Get a hash of the contents of a Maud input directory's files.
+
+    The hash also covers Maud's own source code, so that inputs cached or
+    bundled by one version of the code are not reused by another.
+
+    """
+    h = hashlib.sha256()
+    h.update(CACHE_FORMAT_VERSION.encode())
+    h.update(get_maud_code_hash().encode())
+    for path in get_input_files(data_path):
+        with open(path, "rb") as f:
+            contents = f.read()
+        h.update(len(contents).to_bytes(8, "little"))
+        h.update(contents)
+    return h.hexdigest()
+
+
+@functools.lru_cache(maxsize=None)
+def get_maud_code_hash() -> str:
+    """Get a hash of the python source files of the Maud package.
+
+    Unlike the package version, this changes whenever the code does, including
+    in an editable install.
+
+    """
+    package_dir = os.path.dirname(os.path.abspath(__file__))
+    h = hashlib.sha256()
+    for root, dirs, files in os.walk(package_dir):
+        dirs.sort()
+        for name in sorted(f for f in files if f.endswith(".py")):
+            path = os.path.join(root, name)
+            with open(path, "rb") as f:
+                contents = f.read()
+            h.update(os.path.relpath(path, package_dir).encode())
+            h.update(len(contents).to_bytes(8, "little"))
+            h.update(contents)
+    return h.hexdigest()
+
+
+def write_cache_entry(mi: MaudInput, cache_path: str) -> None:
+    """Atomically write a pickled MaudInput to cache_path."""
+    cache_dir = os.path.dirname(cache_path)
+    os.makedirs(cache_dir, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=cache_dir, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            pickle.dump(mi, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, cache_path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+
+def evict_cache_entries(cache_dir: str, max_bytes: int) -> None:
+    """Delete least recently used cache entries until under max_bytes."""
+    entries = [
+        os.path.join(cache_dir, f)
+        for f in os.listdir(cache_dir)
+        if f.endswith(".pkl")
+    ]
+    entries.sort(key=os.path.getmtime, reverse=True)
+    total = 0
+    for path in entries:
+        total += os.path.getsize(path)
+        if total > max_bytes:
+            os.remove(path)
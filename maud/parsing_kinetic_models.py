@@ -1,7 +1,7 @@
 """Functions for parsing kinetic models from raw Maud input data."""
 
 from datetime import datetime
-from typing import List
+from typing import List, Set
 
 from maud.data_model.kinetic_model import (
     Allostery,
@@ -70,8 +70,9 @@ def parse_kinetic_model(raw: dict) -> KineticModel:
             )
             for a in raw["allostery"]
         ]
+        allosteric_enzyme_ids = {a.enzyme_id for a in allosteries}
         allosteric_enzymes = [
-            e for e in enzymes if any(a.enzyme_id == e.id for a in allosteries)
+            e for e in enzymes if e.id in allosteric_enzyme_ids
         ]
     else:
         allosteries = None
@@ -122,7 +123,7 @@ def parse_metabolites(raw: dict) -> List[Metabolite]:
 
     """
     metabolites = []
-    explicit_met_ids = []
+    explicit_met_ids: Set[str] = set()
     if "metabolite" in raw.keys():
         metabolites = [
             Metabolite(
@@ -132,7 +133,7 @@ def parse_metabolites(raw: dict) -> List[Metabolite]:
             )
             for m in raw["metabolite"]
         ]
-        explicit_met_ids = [m.id for m in metabolites]
+        explicit_met_ids = {m.id for m in metabolites}
     for mic_met_id in set(
         mic["metabolite_id"] for mic in raw["metabolite_in_compartment"]
     ):
@@ -150,7 +151,7 @@ def parse_enzymes(raw: dict) -> List[Enzyme]:
 
     """
     enzymes = []
-    explicit_enz_ids = []
+    explicit_enz_ids: Set[str] = set()
     if "enzyme" in raw.keys():
         enzymes = [
             Enzyme(
@@ -160,7 +161,7 @@ def parse_enzymes(raw: dict) -> List[Enzyme]:
             )
             for e in raw["enzyme"]
         ]
-        explicit_enz_ids = [e.id for e in enzymes]
+        explicit_enz_ids = {e.id for e in enzymes}
     for er_enz_id in set(er["enzyme_id"] for er in raw["enzyme_reaction"]):
         if er_enz_id not in explicit_enz_ids:
             enzymes.append(Enzyme(id=er_enz_id, name=None, subunits=1))
@@ -3,16 +3,22 @@
 import os
 import shutil
 import warnings
+from contextlib import contextmanager
 from pathlib import Path
+from typing import TYPE_CHECKING, Iterator, List, Optional, Union
 
-import arviz as az
 import cmdstanpy
 from cmdstanpy import CmdStanLaplace, CmdStanMLE
 from cmdstanpy.stanfit.mcmc import CmdStanMCMC
 from cmdstanpy.stanfit.pathfinder import CmdStanPathfinder
 from cmdstanpy.stanfit.vb import CmdStanVB
 
+from maud.data_model.maud_bundle import MaudBundle, get_coords
 from maud.data_model.maud_input import MaudInput
+from maud.writing_stan_data import write_stan_data
+
+if TYPE_CHECKING:
+    import arviz as az
 
 CMDSTAN_VERSION = "2.33.1"
 
@@ -26,6 +32,12 @@ STAN_PROGRAM_RELATIVE_PATH_PREDICT = os.path.join(
 )
 PPC_PROGRAM_RELATIVE_PATH = "out_of_sample_model.stan"
 
+# on Windows specifically, we should point cmdstanpy to the repackaged
+# CmdStan if it exists. This lets cmdstanpy handle the TBB path for us.
+LOCAL_CMDSTAN = STAN_FILES_FOLDER / f"cmdstan-{CMDSTAN_VERSION}"
+if os.path.exists(LOCAL_CMDSTAN):
+    cmdstanpy.set_cmdstan_path(str((LOCAL_CMDSTAN.resolve())))
+
 DEFAULT_SAMPLE_CONFIG = {
     "iter_warmup": 5,
     "iter_sampling": 5,
@@ -78,6 +90,8 @@ def load_stan_model(
             cpp_options=cpp_options,
             stanc_options=stanc_options,
         )
+        if uses_threads(cpp_options) and not uses_threads(model.exe_info()):
+            raise ValueError(f"'{name}.exe' was built without STAN_THREADS")
     except ValueError:
         warnings.warn(
             f"Failed to load pre-built model '{name}.exe', compiling",
@@ -87,6 +101,8 @@ def load_stan_model(
             stan_file=STAN_FILES_FOLDER / f"{name}.stan",
             cpp_options=cpp_options,
             stanc_options=stanc_options,
+            # an existing build might not have the requested threading
+            force_compile=uses_threads(cpp_options),
         )
         shutil.copy(
             model.exe_file,  # type: ignore
@@ -96,6 +112,46 @@ def load_stan_model(
     return model
 
 
+def uses_threads(cpp_options: Optional[dict]) -> bool:
+    """Check if some cpp options, or a model's exe info, enable threading."""
+    if cpp_options is None:
+        return False
+    return str(cpp_options.get("STAN_THREADS", False)).lower() == "true"
+
+
+def get_cpp_options(mi: MaudInput) -> Optional[dict]:
+    """Get the cpp options for mi, enabling threading if it is needed.
+
+    The experiments are simulated in parallel with Stan's reduce_sum, which
+    needs a model compiled with STAN_THREADS to use more than one thread.
+
+    """
+    if mi.config.threads_per_chain == 1:
+        return mi.config.cpp_options
+    return {**(mi.config.cpp_options or {}), "STAN_THREADS": True}
+
+
+@contextmanager
+def stan_num_threads(mi: MaudInput) -> Iterator[None]:
+    """Set the number of threads for methods that don't take it as an argument.
+
+    cmdstanpy passes threads_per_chain to CmdStan when sampling, but other
+    methods read it from the STAN_NUM_THREADS environment variable. The
+    variable's previous value is restored on exit so that later CmdStan runs
+    in the same process are not affected.
+
+    """
+    previous = os.environ.get("STAN_NUM_THREADS")
+    os.environ["STAN_NUM_THREADS"] = str(mi.config.threads_per_chain)
+    try:
+        yield
+    finally:
+        if previous is None:
+            del os.environ["STAN_NUM_THREADS"]
+        else:
+            os.environ["STAN_NUM_THREADS"] = previous
+
+
 def sample(mi: MaudInput, output_dir: str) -> CmdStanMCMC:
     """Sample from the posterior defined by mi.
 
@@ -103,7 +159,7 @@ def sample(mi: MaudInput, output_dir: str) -> CmdStanMCMC:
     :param output_dir: a string specifying where to save the output.
     """
     model = load_stan_model(
-        "model", mi.config.cpp_options, mi.config.stanc_options
+        "model", get_cpp_options(mi), mi.config.stanc_options
     )
     set_up_output_dir(output_dir, mi)
     sample_args: dict = {
@@ -111,7 +167,11 @@ def sample(mi: MaudInput, output_dir: str) -> CmdStanMCMC:
         "inits": os.path.join(output_dir, "inits.json"),
         "output_dir": output_dir,
     }
-    sample_args = {**sample_args, **DEFAULT_SAMPLE_CONFIG}
+    sample_args = {
+        **sample_args,
+        **DEFAULT_SAMPLE_CONFIG,
+        "threads_per_chain": mi.config.threads_per_chain,
+    }
     if mi.config.cmdstanpy_config is not None:
         sample_args = {**sample_args, **mi.config.cmdstanpy_config}
     return model.sample(**sample_args)
@@ -129,18 +189,19 @@ def variational(mi: MaudInput, output_dir: str) -> CmdStanVB:
         else mi.config.variational_options
     )
     model = load_stan_model(
-        "model", mi.config.cpp_options, mi.config.stanc_options
+        "model", get_cpp_options(mi), mi.config.stanc_options
     )
     set_up_output_dir(output_dir, mi)
-    return model.variational(
-        data=os.path.join(output_dir, "input_data_train.json"),
-        inits=os.path.join(output_dir, "inits.json"),
-        **{
-            **DEFAULT_VARIATIONAL_CONFIG,
-            **mi_options,
-            **{"output_dir": output_dir},
-        },
-    )
+    with stan_num_threads(mi):
+        return model.variational(
+            data=os.path.join(output_dir, "input_data_train.json"),
+            inits=os.path.join(output_dir, "inits.json"),
+            **{
+                **DEFAULT_VARIATIONAL_CONFIG,
+                **mi_options,
+                **{"output_dir": output_dir},
+            },
+        )
 
 
 def pathfinder(mi: MaudInput, output_dir: str) -> CmdStanPathfinder:
@@ -155,18 +216,19 @@ def pathfinder(mi: MaudInput, output_dir: str) -> CmdStanPathfinder:
         else mi.config.pathfinder_options
     )
     model = load_stan_model(
-        "model", mi.config.cpp_options, mi.config.stanc_options
+        "model", get_cpp_options(mi), mi.config.stanc_options
     )
     set_up_output_dir(output_dir, mi)
-    return model.pathfinder(
-        data=os.path.join(output_dir, "input_data_train.json"),
-        inits=os.path.join(output_dir, "inits.json"),
-        **{
-            **DEFAULT_PATHFINDER_CONFIG,
-            **mi_options,
-            **{"output_dir": output_dir},
-        },
-    )
+    with stan_num_threads(mi):
+        return model.pathfinder(
+            data=os.path.join(output_dir, "input_data_train.json"),
+            inits=os.path.join(output_dir, "inits.json"),
+            **{
+                **DEFAULT_PATHFINDER_CONFIG,
+                **mi_options,
+                **{"output_dir": output_dir},
+            },
+        )
 
 
 def laplace(mi: MaudInput, output_dir: str) -> CmdStanLaplace:
@@ -194,14 +256,15 @@ def laplace(mi: MaudInput, output_dir: str) -> CmdStanLaplace:
             DEFAULT_OPTIMIZE_CONFIG | mi_options_optimize | fixed_args_opt
         )
     model = load_stan_model(
-        "model", mi.config.cpp_options, mi.config.stanc_options
+        "model", get_cpp_options(mi), mi.config.stanc_options
     )
     set_up_output_dir(output_dir, mi)
-    return model.laplace_sample(
-        data=os.path.join(output_dir, "input_data_train.json"),
-        opt_args=opt_args,
-        **laplace_args,
-    )
+    with stan_num_threads(mi):
+        return model.laplace_sample(
+            data=os.path.join(output_dir, "input_data_train.json"),
+            opt_args=opt_args,
+            **laplace_args,
+        )
 
 
 def simulate(mi: MaudInput, output_dir: str, n: int) -> CmdStanMCMC:
@@ -211,7 +274,7 @@ def simulate(mi: MaudInput, output_dir: str, n: int) -> CmdStanMCMC:
     :param output_dir: a string specifying where to save the output.
     """
     model = load_stan_model(
-        "model", mi.config.cpp_options, mi.config.stanc_options
+        "model", get_cpp_options(mi), mi.config.stanc_options
     )
     set_up_output_dir(output_dir, mi)
     return model.sample(
@@ -233,115 +296,83 @@ def optimize(mi: MaudInput, output_dir: str) -> CmdStanMLE:
         {} if mi.config.optimize_options is None else mi.config.optimize_options
     )
     model = load_stan_model(
-        "model", mi.config.cpp_options, mi.config.stanc_options
+        "model", get_cpp_options(mi), mi.config.stanc_options
     )
     set_up_output_dir(output_dir, mi)
-    return model.optimize(
-        data=os.path.join(output_dir, "input_data_train.json"),
-        inits=os.path.join(output_dir, "inits.json"),
-        output_dir=output_dir,
-        **{
-            **DEFAULT_OPTIMIZE_CONFIG,
-            **mi_options,
-        },
-    )
+    with stan_num_threads(mi):
+        return model.optimize(
+            data=os.path.join(output_dir, "input_data_train.json"),
+            inits=os.path.join(output_dir, "inits.json"),
+            output_dir=output_dir,
+            **{
+                **DEFAULT_OPTIMIZE_CONFIG,
+                **mi_options,
+            },
+        )
+
+
+def set_up_output_dir(output_dir: str, mi: Union[MaudInput, MaudBundle]):
+    """Write input data and inits to the output directory.
 
+    :param output_dir: directory where the files will be written
+    :param mi: a MaudInput object or MaudBundle
 
-def set_up_output_dir(output_dir: str, mi: MaudInput):
-    """Write input data and inits to the output directory."""
+    """
     input_path_train = os.path.join(output_dir, "input_data_train.json")
     input_path_test = os.path.join(output_dir, "input_data_test.json")
     inits_path = os.path.join(output_dir, "inits.json")
-    cmdstanpy.utils.write_stan_json(input_path_train, mi.stan_input_train)
+    write_stan_data(input_path_train, mi.stan_input_train)
     if mi.stan_input_test is not None:
-        cmdstanpy.utils.write_stan_json(input_path_test, mi.stan_input_test)
-    cmdstanpy.utils.write_stan_json(inits_path, mi.inits_dict)
+        write_stan_data(input_path_test, mi.stan_input_test)
+    write_stan_data(inits_path, mi.inits_dict)
 
 
 def predict(
-    mi: MaudInput,
+    mi: Union[MaudInput, MaudBundle],
     output_dir: str,
-    idata_train: az.InferenceData,
-) -> az.InferenceData:
-    """Call CmdStanModel.sample for out of sample predictions.
+    fit_csv_files: List[str],
+) -> "az.InferenceData":
+    """Simulate the test experiments for every posterior draw.
 
-    :param mi: a MaudInput object
+    CmdStan's generate_quantities method reads the kinetic parameters of each
+    draw from the training output, so every draw gets its own output row. If
+    the simulation fails for a draw, only that draw's row is missing.
+
+    :param mi: a MaudInput object, or a MaudBundle from a previous run
     :param output_dir: directory where output will be saved
-    :param idata_train: InferenceData object with posterior draws
+    :param fit_csv_files: csv files of the training run, one per chain
     """
+    import arviz as az
+
     model = load_stan_model(
         "out_of_sample_model", mi.config.cpp_options, mi.config.stanc_options
     )
     set_up_output_dir(output_dir, mi)
-    kinetic_parameters = [
-        "keq",
-        "km",
-        "kcat",
-        "dissociation_constant",
-        "transfer_constant",
-        "kcat_phos",
-        "ki",
-    ]
-    posterior = idata_train.get("posterior")
-    sample_stats = idata_train.get("sample_stats")
-    assert posterior is not None
-    assert sample_stats is not None
-    chains = sample_stats["chain"]
-    draws = sample_stats["draw"]
-    dims = {
-        "conc_test": ["experiment", "mic"],
-        "conc_enzyme_test": ["experiment", "enzyme"],
-        "flux_test": ["experiment", "reaction"],
+    coords = get_coords(mi, "test")
+    gq_args: dict = {
+        "data": os.path.join(output_dir, "input_data_test.json"),
+        "previous_fit": fit_csv_files,
+        "gq_output_dir": output_dir,
     }
-    for chain in chains:
-        for draw in draws:
-            inits = {
-                par: (
-                    posterior[par]
-                    .sel(chain=chain, draw=draw)
-                    .to_series()
-                    .values
-                )
-                for par in kinetic_parameters
-                if par in posterior.keys()
-            }
-            sample_args: dict = {
-                "data": os.path.join(output_dir, "input_data_test.json"),
-                "inits": inits,
-                "output_dir": output_dir,
-                "iter_warmup": 0,
-                "iter_sampling": 1,
-                "adapt_engaged": False,
-                "fixed_param": True,
-            }
-            if mi.config.cmdstanpy_config_predict is not None:
-                sample_args = {
-                    **mi.config.cmdstanpy_config_predict,
-                    **sample_args,
-                }
-            sample_args["chains"] = 1
-            mcmc_draw = model.sample(**sample_args)
-            idata_draw = az.from_cmdstan(
-                mcmc_draw.runset.csv_files,
-                coords={
-                    "experiment": [e.id for e in mi.experiments if e.is_test],
-                    "mic": [m.id for m in mi.kinetic_model.mics],
-                    "enzyme": [e.id for e in mi.kinetic_model.enzymes],
-                    "reaction": [r.id for r in mi.kinetic_model.reactions],
-                },
-                dims=dims,
-            ).assign_coords(
-                coords={"chain": [chain], "draw": [draw]},
-                groups="posterior_groups",
-            )
-            if draw == 0:
-                idata_chain = idata_draw.copy()
-            else:
-                idata_chain = az.concat(
-                    [idata_chain, idata_draw], dim="draw", reset_dim=False
-                )
-        if chain == 0:
-            out = idata_chain.copy()
-        else:
-            out = az.concat([out, idata_chain], dim="chain", reset_dim=False)
-    return out
+    if mi.config.cmdstanpy_config_predict is not None:
+        gq_args = {**mi.config.cmdstanpy_config_predict, **gq_args}
+    gq = model.generate_quantities(**gq_args)
+    posterior_predict = {}
+    for name in gq.metadata.stan_vars:
+        # shape (chain * draw, ...) with draws in chain order
+        draws = gq.stan_variable(name)
+        posterior_predict[name] = draws.reshape(gq.chains, -1, *draws.shape[1:])
+    return az.from_dict(
+        posterior=posterior_predict,
+        coords={
+            "experiment": coords["experiments"],
+            "mic": coords["mics"],
+            "enzyme": coords["enzymes"],
+            "reaction": coords["reactions"],
+        },
+        dims={
+            "conc_test": ["experiment", "mic"],
+            "conc_enzyme_test": ["experiment", "enzyme"],
+            "flux_test": ["experiment", "reaction"],
+        },
+    )
@@ -1,12 +1,10 @@
 """General purpose utility functions."""
 
-from typing import Any, Dict, Hashable, List
+from functools import cached_property
+from typing import Any, Dict, Hashable, Iterable, List, Optional
 
 import numpy as np
 import pandas as pd
-import sympy as sp
-from depinfo import print_dependencies
-from scipy.stats import norm
 
 
 def join_str_cols(df: pd.DataFrame, sep: str, name=None) -> pd.Series:
@@ -23,6 +21,8 @@ def load_df(read_csv_input, **kwargs) -> pd.DataFrame:
 
 def show_versions():
     """Print dependency information."""
+    from depinfo import print_dependencies
+
     print_dependencies("maud")
 
 
@@ -61,6 +61,24 @@ def read_with_fallback(k: Hashable, d: Dict, default: Any):
     return d[k] if k in d.keys() else default
 
 
+def clear_cached_properties(
+    obj: Any, names: Optional[Iterable[str]] = None
+) -> None:
+    """Forget the values that obj's cached properties have stored.
+
+    :param obj: the object whose cache should be cleared
+    :param names: the cached properties to clear, or None to clear all of them
+
+    """
+    to_clear = set(names) if names is not None else None
+    for cls in type(obj).__mro__:
+        for name, attr in vars(cls).items():
+            if isinstance(attr, cached_property) and (
+                to_clear is None or name in to_clear
+            ):
+                obj.__dict__.pop(name, None)
+
+
 def codify(lx: List) -> Dict[str, int]:
     """Turn a list of strings into a dictionary mapping them to integers."""
     return dict(zip(lx, range(1, len(lx) + 1)))
@@ -73,6 +91,8 @@ def get_lognormal_parameters_from_quantiles(x1, p1, x2, p2):
     x1) = p1 and pr(X < x2) = p2.
 
     """
+    from scipy.stats import norm
+
     logx1 = np.log(x1)
     logx2 = np.log(x2)
     denom = norm.ppf(p2) - norm.ppf(p1)
@@ -88,6 +108,8 @@ def get_normal_parameters_from_quantiles(x1, p1, x2, p2):
     x1) = p1 and pr(X < x2) = p2.
 
     """
+    from scipy.stats import norm
+
     denom = norm.ppf(p2) - norm.ppf(p1)
     sigma = (x2 - x1) / denom
     mu = (x1 * norm.ppf(p2) - x2 * norm.ppf(p1)) / denom
@@ -143,12 +165,17 @@ def get_left_nullspace(matrix: pd.DataFrame, atol=1e-13, rtol=0.0):
 
     """  # noqa: D402
     matrix = np.atleast_2d(matrix)
-    _, sigma, vh = np.linalg.svd(matrix.T)
-    tol = max(atol, rtol * sigma[0])
+    # the full left singular vectors are only needed for wide matrices
+    _, sigma, vh = np.linalg.svd(
+        matrix.T, full_matrices=matrix.shape[1] < matrix.shape[0]
+    )
+    tol = max(atol, rtol * sigma[0]) if len(sigma) > 0 else atol
     num_nonzero = (sigma >= tol).sum()
     return vh[num_nonzero:].conj().T
 
 
 def get_rref(mat):
     """Return reduced row echelon form of a matrix."""
+    import sympy as sp
+
     return sp.Matrix(mat).rref(iszerofunc=lambda x: abs(x) < 1e-10)[0]
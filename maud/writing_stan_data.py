@@ -0,0 +1,80 @@
+"""Functions for writing Stan input data to json files."""
+
+import json
+import os
+import tempfile
+from typing import Any, Mapping
+
+import numpy as np
+
+
+def to_json_value(value: Any) -> Any:
+    """Convert a numpy object into something the json module can encode."""
+    if isinstance(value, np.ndarray):
+        if value.dtype.kind == "b":  # stan uses 0, 1
+            value = value.astype(int)
+        return value.tolist()
+    if isinstance(value, np.bool_):
+        return int(value)
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"Cannot write {type(value)} to a Stan json file.")
+
+
+def dump_stan_json(data: Mapping[str, Any]) -> str:
+    """Convert Stan input data to a json string.
+
+    This does the same as cmdstanpy.utils.write_stan_json, but encodes
+    everything in one call to json.dumps, which uses the json module's C
+    encoder.
+
+    :param data: a mapping from strings to numbers, booleans, lists or numpy
+    arrays.
+
+    """
+    return json.dumps(
+        {k: int(v) if isinstance(v, bool) else v for k, v in data.items()},
+        default=to_json_value,
+    )
+
+
+def write_stan_data(path: str, data: Mapping[str, Any]) -> None:
+    """Write Stan input data to a json file.
+
+    If the file at path already contains the same json text, it is left as it
+    is.
+
+    :param path: where to write the json file
+    :param data: a mapping from strings to numbers, booleans, lists or numpy
+    arrays.
+
+    """
+    contents = dump_stan_json(data)
+    if has_contents(path, contents):
+        return
+    write_atomically(path, contents)
+
+
+def has_contents(path: str, contents: str) -> bool:
+    """Check if the file at path exists and contains a string."""
+    try:
+        if os.path.getsize(path) != len(contents.encode()):
+            return False
+        with open(path) as f:
+            return f.read() == contents
+    except FileNotFoundError:
+        return False
+
+
+def write_atomically(path: str, contents: str) -> None:
+    """Write a string to a file, so that the file is never half-written."""
+    fd, tmp_path = tempfile.mkstemp(
+        dir=os.path.dirname(os.path.abspath(path)), suffix=".tmp"
+    )
+    try:
+        with os.fdopen(fd, "w") as f:
+            f.write(contents)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
@@ -0,0 +1,61 @@
+"""Shared fixtures for Maud's tests."""
+
+from typing import Callable
+
+import pytest
+
+
+def synthetic_raw_kinetic_model(n_reactions: int) -> dict:
+    """Get a raw kinetic model with a long chain of reactions.
+
+    Every reaction has an enzyme, an allosteric modifier and a competitive
+    inhibitor, so that every cross-reference validator has work to do. Only
+    the second metabolite is balanced, so the left nullspace is cheap to
+    compute.
+
+    """
+    mets = [f"m{i}" for i in range(n_reactions + 1)]
+    return {
+        "name": "synthetic",
+        "compartment": [{"id": "c", "name": "cytosol", "volume": 1.0}],
+        "metabolite_in_compartment": [
+            {"metabolite_id": m, "compartment_id": "c", "balanced": i == 1}
+            for i, m in enumerate(mets)
+        ],
+        "reaction": [
+            {
+                "id": f"r{i}",
+                "mechanism": "reversible_michaelis_menten",
+                "stoichiometry": {f"{mets[i]}_c": -1, f"{mets[i + 1]}_c": 1},
+            }
+            for i in range(n_reactions)
+        ],
+        "enzyme_reaction": [
+            {"enzyme_id": f"e{i}", "reaction_id": f"r{i}"}
+            for i in range(n_reactions)
+        ],
+        "allostery": [
+            {
+                "enzyme_id": f"e{i}",
+                "metabolite_id": mets[-1],
+                "compartment_id": "c",
+                "modification_type": "inhibition",
+            }
+            for i in range(n_reactions)
+        ],
+        "competitive_inhibition": [
+            {
+                "enzyme_id": f"e{i}",
+                "reaction_id": f"r{i}",
+                "metabolite_id": mets[0],
+                "compartment_id": "c",
+            }
+            for i in range(n_reactions)
+        ],
+    }
+
+
+@pytest.fixture
+def get_synthetic_raw_kinetic_model() -> Callable[[int], dict]:
+    """Get a function that makes synthetic raw kinetic models."""
+    return synthetic_raw_kinetic_model
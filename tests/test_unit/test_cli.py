@@ -1,12 +1,39 @@
 """Test functions in the cli module."""
 
+import subprocess
+import sys
+
 from click.testing import CliRunner
 
 from maud.cli import cli
 
+HEAVY_MODULES = ["arviz", "cmdstanpy", "stanio", "sympy", "scipy", "pandas"]
+
 
 def test_maud_help():
     """Test that running `maud --help` does not raise an error."""
     runner = CliRunner()
     result = runner.invoke(cli, ["--help"])
     assert result.exit_code == 0
+
+
+def test_cli_import_avoids_heavy_modules():
+    """Test that importing maud.cli avoids heavy dependencies.
+
+    This runs in a fresh interpreter so that modules imported by other tests
+    don't count.
+
+    """
+    script = (
+        "import sys\n"
+        "import maud.cli\n"
+        f"print(','.join(m for m in {HEAVY_MODULES} if m in sys.modules))\n"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", script],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    heavy_imported = result.stdout.strip()
+    assert heavy_imported == "", f"maud.cli imported {heavy_imported}"
@@ -0,0 +1,102 @@
+"""Unit tests for the Experiment class and its measurement table."""
+
+import pytest
+
+from maud.data_model.experiment import (
+    MeasurementType,
+    get_experiments_measurement_table,
+    parse_experiment,
+    read_measurement_tables,
+)
+
+
+def get_raw_experiment(experiment_id: str) -> dict:
+    """Get a raw experiment with one measurement of each type."""
+    return {
+        "id": experiment_id,
+        "is_train": True,
+        "is_test": False,
+        "measurements": [
+            {
+                "target_type": "mic",
+                "metabolite": "M1",
+                "compartment": "c",
+                "value": 0.5,
+                "error_scale": 0.1,
+            },
+            {
+                "target_type": "flux",
+                "reaction": "r1",
+                "value": 2.0,
+                "error_scale": 0.2,
+            },
+            {
+                "target_type": "enzyme",
+                "enzyme": "r1",
+                "value": 1.5,
+                "error_scale": 0.3,
+            },
+        ],
+    }
+
+
+def test_measurement_table():
+    """Check that measurements are stored and selected as columns."""
+    experiments = [parse_experiment(get_raw_experiment(e)) for e in "ab"]
+    table = get_experiments_measurement_table(experiments)
+    assert table.experiment_ids == ["a", "b"]
+    assert table.experiment_code.tolist() == [0, 0, 0, 1, 1, 1]
+    assert table.experiment.tolist() == ["a", "a", "a", "b", "b", "b"]
+    assert table.value.tolist() == [0.5, 2.0, 1.5] * 2
+    flux_b = table.select(
+        table.is_type(MeasurementType.FLUX) & table.in_experiments(["b"])
+    )
+    assert len(flux_b) == 1
+    assert flux_b.error_scale.tolist() == [0.2]
+    assert flux_b.get_target_codes(["r0", "r1"]).tolist() == [2]
+    with pytest.raises(ValueError, match="unknown targets"):
+        flux_b.get_target_codes(["r0"])
+
+
+def test_measurement_table_cache():
+    """Check that an experiment's table is refreshed when it changes."""
+    experiment = parse_experiment(get_raw_experiment("a"))
+    assert len(experiment.measurement_table) == 3
+    experiment.measurements = experiment.measurements[:1]
+    assert len(experiment.measurement_table) == 1
+
+
+def test_read_measurement_tables(tmp_path):
+    """Check that a csv file of measurements is read per experiment."""
+    path = tmp_path / "measurements.csv"
+    path.write_text(
+        "experiment,target_type,metabolite,compartment,reaction,value,"
+        "error_scale\n"
+        "a,mic,M1,c,,0.5,0.1\n"
+        "b,flux,,,r1,2.0,0.2\n"
+        "a,flux,,,r1,1.0,0.2\n"
+    )
+    tables = read_measurement_tables(str(path))
+    assert list(tables) == ["a", "b"]
+    assert tables["a"].target_id.tolist() == ["M1_c", "r1"]
+    assert tables["a"].value.tolist() == [0.5, 1.0]
+    experiment = parse_experiment(get_raw_experiment("a"), tables["a"])
+    assert len(experiment.measurement_table) == 5
+    path.write_text(
+        "experiment,target_type,moiety_id,value,error_scale\n"
+        "a,conserved_moiety,X,1.0,0.1\n"
+    )
+    table = read_measurement_tables(str(path))["a"]
+    assert table.target_type.tolist() == ["conserved_moiety"]
+    assert table.target_id.tolist() == ["X"]
+    assert experiment.measurement_table.experiment_ids == ["a"]
+    path.write_text(
+        "experiment,target_type,reaction,value,error_scale\na,flux,r1,1.0,0\n"
+    )
+    with pytest.raises(ValueError, match="error scales"):
+        read_measurement_tables(str(path))
+    path.write_text(
+        "experiment,target_type,reaction,value,error_scale\na,mic,r1,1.0,1\n"
+    )
+    with pytest.raises(ValueError, match="without a metabolite"):
+        read_measurement_tables(str(path))
@@ -0,0 +1,201 @@
+"""Unit tests for the functions that get Stan inputs."""
+
+import time
+from typing import Tuple
+
+import importlib_resources
+import numpy as np
+import pytest
+
+from maud.data.example_inputs import linear, methionine
+from maud.data_model.experiment import Experiment, InitConcentration
+from maud.data_model.maud_config import MaudConfig, ODESolverConfig
+from maud.data_model.maud_init import InitInput
+from maud.data_model.parameter_input import ParameterSetInput
+from maud.data_model.parameter_set import ParameterSet
+from maud.getting_stan_inputs import (
+    encode_csr,
+    encode_ragged,
+    get_conc_init,
+    get_config_input,
+    get_network_properties_input,
+    get_ode_checkpoints,
+)
+from maud.loading_maud_inputs import load_maud_input
+from maud.parsing_kinetic_models import parse_kinetic_model
+
+N_EDGES_BENCHMARK = 5_000
+NETWORK_PROPERTIES_TIME_BUDGET_SECONDS = 2.0
+
+
+def test_encode_ragged():
+    """Check that ragged lists are encoded as flat arrays with bounds."""
+    flat, bounds = encode_ragged([[3, 1], [], [2]])
+    assert flat.tolist() == [3, 1, 2]
+    assert bounds.tolist() == [[1, 2], [3, 2], [3, 3]]
+    flat, bounds = encode_ragged([])
+    assert flat.shape == (0,) and bounds.shape == (0, 2)
+
+
+def test_encode_csr():
+    """Check that the CSR encoding of a matrix reproduces its products."""
+    S = np.array([[-1.0, 0.0, 2.0], [0.0, 0.0, 0.0], [1.0, -1.0, 0.0]])
+    w, v, u = encode_csr(S)
+    assert w.tolist() == [-1.0, 2.0, 1.0, -1.0]
+    assert v.tolist() == [1, 3, 1, 2]
+    assert u.tolist() == [1, 3, 3, 5]
+    x = np.array([0.5, 2.0, -3.0])
+    assert np.allclose(csr_matrix_vector_product(w, v, u, x), S @ x)
+
+
+def csr_matrix_vector_product(
+    w: np.ndarray, v: np.ndarray, u: np.ndarray, x: np.ndarray
+) -> np.ndarray:
+    """Multiply a vector by a matrix in Stan's CSR format."""
+    return np.array(
+        [
+            w[u[i] - 1 : u[i + 1] - 1] @ x[v[u[i] - 1 : u[i + 1] - 1] - 1]
+            for i in range(len(u) - 1)
+        ]
+    )
+
+
+@pytest.mark.parametrize("example", [linear, methionine])
+def test_network_csr_matches_dense(example):
+    """Check that the CSR inputs give the same products as the dense S."""
+    mi = load_maud_input(str(importlib_resources.files(example)))
+    stan_input = mi.stan_input_train
+    S = np.array(stan_input["S"])
+    rng = np.random.default_rng(0)
+    edge_flux = rng.normal(size=S.shape[1])
+    conc = rng.normal(size=S.shape[0])
+    assert np.allclose(
+        csr_matrix_vector_product(
+            stan_input["S_csr_w"],
+            stan_input["S_csr_v"],
+            stan_input["S_csr_u"],
+            edge_flux,
+        ),
+        S @ edge_flux,
+    )
+    assert np.allclose(
+        csr_matrix_vector_product(
+            stan_input["S_transpose_csr_w"],
+            stan_input["S_transpose_csr_v"],
+            stan_input["S_transpose_csr_u"],
+            conc,
+        ),
+        S.T @ conc,
+    )
+
+
+def test_get_config_input_steady_state_solver():
+    """Check that the chosen steady state solver is passed to Stan."""
+    raw_config = {
+        "name": "test",
+        "kinetic_model_file": "kinetic_model.toml",
+        "priors_file": "priors.toml",
+        "experiments_file": "experiments.toml",
+        "likelihood": True,
+    }
+    assert (
+        get_config_input(MaudConfig(**raw_config))["steady_state_solver"] == 0
+    )
+    config = MaudConfig(
+        **raw_config,
+        steady_state_solver="powell",
+        algebra_solver_config={"timepoint": 1.0},
+    )
+    config_input = get_config_input(config)
+    assert config_input["steady_state_solver"] == 2
+    assert config_input["timepoint_alg"] == 1.0
+    assert config_input["rel_tol_alg"] == 1e-7
+    assert config_input["scaling_step_alg"] == 1e-3
+
+
+def test_get_config_input_log_concentration():
+    """Check that the log concentration ODE option is passed to Stan."""
+    raw_config = {
+        "name": "test",
+        "kinetic_model_file": "kinetic_model.toml",
+        "priors_file": "priors.toml",
+        "experiments_file": "experiments.toml",
+        "likelihood": True,
+    }
+    assert get_config_input(MaudConfig(**raw_config))["log_conc_ode"] == 0
+    config = MaudConfig(
+        **raw_config, ode_solver_config={"log_concentration": True}
+    )
+    assert get_config_input(config)["log_conc_ode"] == 1
+
+
+def test_get_ode_checkpoints():
+    """Check that checkpoints grow geometrically and end at timepoint."""
+    config = ODESolverConfig(
+        timepoint=50.0, first_checkpoint=2.0, checkpoint_ratio=3.0
+    )
+    assert get_ode_checkpoints(config) == [0.0, 2.0, 6.0, 18.0, 50.0]
+    assert get_ode_checkpoints(ODESolverConfig(timepoint=0.5)) == [0.0, 0.5]
+
+
+def test_get_conc_init():
+    """Check that initial concentrations are geometric means or defaults."""
+    mi = load_maud_input(str(importlib_resources.files(linear)))
+    default = mi.config.default_initial_concentration
+    extra_m1 = InitConcentration(metabolite="M1", compartment="c", value=2.0)
+    condition1 = mi.experiments[0]
+    experiments = [
+        condition1.model_copy(
+            update={
+                "is_test": False,
+                "initial_state": condition1.initial_state + [extra_m1],
+            }
+        ),
+        Experiment(id="unmeasured", is_train=False, is_test=True),
+    ]
+    inits_train, inits_test = get_conc_init(
+        experiments, mi.kinetic_model, mi.config
+    )
+    np.testing.assert_allclose(inits_train, [[np.sqrt(0.59 * 2.0), 0.38]])
+    np.testing.assert_allclose(inits_test, [[default, default]])
+
+
+def get_synthetic_network_properties(raw: dict) -> Tuple[dict, float]:
+    """Get a synthetic network's properties and how long they took to find."""
+    kinetic_model = parse_kinetic_model(raw)
+    parameters = ParameterSet(
+        kinetic_model=kinetic_model,
+        experiments=[],
+        parameter_set_input=ParameterSetInput(),
+        init_input=InitInput(),
+    )
+    _ = parameters.km  # the kms are parameters, not network properties
+    start = time.perf_counter()
+    network_properties = get_network_properties_input(kinetic_model, parameters)
+    return network_properties, time.perf_counter() - start
+
+
+def test_synthetic_network_properties(get_synthetic_raw_kinetic_model):
+    """Check that each edge of a synthetic network gets its own inhibitor."""
+    network_properties, _ = get_synthetic_network_properties(
+        get_synthetic_raw_kinetic_model(20)
+    )
+    assert network_properties["N_edge"] == 20
+    assert network_properties["ci_ix_bounds"].tolist() == [
+        [i, i] for i in range(1, 21)
+    ]
+
+
+@pytest.mark.benchmark
+def test_network_properties_scale_to_large_networks(
+    get_synthetic_raw_kinetic_model,
+):
+    """Check that a large network's Stan inputs are found quickly."""
+    network_properties, elapsed = get_synthetic_network_properties(
+        get_synthetic_raw_kinetic_model(N_EDGES_BENCHMARK)
+    )
+    assert network_properties["N_edge"] == N_EDGES_BENCHMARK
+    assert elapsed < NETWORK_PROPERTIES_TIME_BUDGET_SECONDS, (
+        f"Getting network properties for {N_EDGES_BENCHMARK} edges "
+        f"took {elapsed:.1f}s"
+    )
@@ -0,0 +1,38 @@
+"""Unit tests for the KineticModel class."""
+
+import time
+
+import pytest
+
+from maud.parsing_kinetic_models import parse_kinetic_model
+
+N_REACTIONS_BENCHMARK = 10_000
+VALIDATION_TIME_BUDGET_SECONDS = 10.0
+
+
+def test_bad_reference_is_caught(get_synthetic_raw_kinetic_model):
+    """Check that a reference to a non-existent mic is rejected."""
+    raw = get_synthetic_raw_kinetic_model(3)
+    raw["allostery"][0]["metabolite_id"] = "not_a_metabolite"
+    with pytest.raises(ValueError, match="has bad mic_id"):
+        parse_kinetic_model(raw)
+
+
+def test_synthetic_network_is_validated(get_synthetic_raw_kinetic_model):
+    """Check that every reaction's modifiers survive validation."""
+    kinetic_model = parse_kinetic_model(get_synthetic_raw_kinetic_model(20))
+    assert len(kinetic_model.allosteric_enzymes) == 20
+    assert len(kinetic_model.competitive_inhibitions) == 20
+
+
+@pytest.mark.benchmark
+def test_validation_scales_to_large_networks(get_synthetic_raw_kinetic_model):
+    """Check that a network with many reactions is validated quickly."""
+    raw = get_synthetic_raw_kinetic_model(N_REACTIONS_BENCHMARK)
+    start = time.perf_counter()
+    kinetic_model = parse_kinetic_model(raw)
+    elapsed = time.perf_counter() - start
+    assert len(kinetic_model.allosteric_enzymes) == N_REACTIONS_BENCHMARK
+    assert (
+        elapsed < VALIDATION_TIME_BUDGET_SECONDS
+    ), f"Validating {N_REACTIONS_BENCHMARK} reactions took {elapsed:.1f}s"
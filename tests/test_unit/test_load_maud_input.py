@@ -1,13 +1,19 @@
 """Unit tests for io functions."""
 
 import json
+import shutil
+import warnings
 
 import importlib_resources
 import numpy as np
+import pandas as pd
+import pytest
+import toml
 from numpy.testing import assert_equal
 
-from maud.data.example_inputs import linear, linear_multidgf
-from maud.loading_maud_inputs import load_maud_input
+from maud.data.example_inputs import linear, linear_multidgf, methionine
+from maud.data_model.maud_input import MaudInput
+from maud.loading_maud_inputs import get_input_hash, load_maud_input
 
 
 def test_load_maud_input():
@@ -43,3 +49,218 @@ def test_load_multidgf():
     files = importlib_resources.files(linear_multidgf)
     mi = load_maud_input(data_path=str(files))  # path 0 is package
     assert mi.inits_dict["dgf_free"] == [-10.0, -32.0]
+
+
+def test_maud_input_cache():
+    """Test that derived quantities are cached and cleared on assignment."""
+    files = importlib_resources.files(linear)
+    mi = load_maud_input(data_path=str(files))
+    assert mi.parameters is mi.parameters
+    assert mi.stan_input_train is mi.stan_inputs[0]
+    assert mi.stan_input_test is mi.stan_inputs[1]
+    train_before = mi.stan_input_train
+    mi.experiments = [e for e in mi.experiments if e.id == "condition1"]
+    assert mi.stan_input_train is not train_before
+    assert mi.stan_input_train["N_experiment_train"] == 1
+
+
+def test_kinetic_model_indexes():
+    """Test that the kinetic model's cached indexes are consistent."""
+    files = importlib_resources.files(linear)
+    km = load_maud_input(data_path=str(files)).kinetic_model
+    for ix, objs in [
+        (km.mic_index, km.mics),
+        (km.reaction_index, km.reactions),
+        (km.enzyme_index, km.enzymes),
+        (km.edge_index, km.edges),
+    ]:
+        assert [objs[i].id for i in ix.values()] == list(ix.keys())
+    assert km.left_nullspace is km.left_nullspace
+    assert km.get_reaction("r1").id == "r1"
+
+
+def test_sparse_stoichiometric_matrix():
+    """Test that the sparse stoichiometric matrix matches the dense one."""
+    files = importlib_resources.files(linear)
+    km = load_maud_input(data_path=str(files)).kinetic_model
+    S_sparse = km.stoichiometric_matrix_sparse
+    assert S_sparse.nnz == sum(len(r.stoichiometry) for r in km.reactions)
+    assert_equal(S_sparse.toarray(), km.stoichiometric_matrix.values)
+    assert km.stoichiometric_matrix.loc["M1_c", "r1_r1"] == 1
+
+
+def test_load_maud_input_cache(tmp_path):
+    """Test that cached inputs are reused and evicted."""
+    files = str(importlib_resources.files(linear))
+    mi = load_maud_input(data_path=files, cache_dir=str(tmp_path))
+    cache_files = list(tmp_path.glob("*.pkl"))
+    assert len(cache_files) == 1
+    assert cache_files[0].stem == get_input_hash(files)
+    mi_cached = load_maud_input(data_path=files, cache_dir=str(tmp_path))
+    assert mi_cached.kinetic_model.name == mi.kinetic_model.name
+    for k, v in mi.stan_input_train.items():
+        assert_equal(mi_cached.stan_input_train[k], v)
+    assert mi_cached.inits_dict.keys() == mi.inits_dict.keys()
+    small_cache = tmp_path / "small"
+    load_maud_input(
+        data_path=files, cache_dir=str(small_cache), cache_max_bytes=0
+    )
+    assert list(small_cache.glob("*.pkl")) == []
+
+
+def test_input_hash_covers_code(monkeypatch):
+    """Test that cached inputs are not reused after Maud's code changes."""
+    from maud import loading_maud_inputs
+
+    files = str(importlib_resources.files(linear))
+    input_hash = get_input_hash(files)
+    assert get_input_hash(files) == input_hash
+    monkeypatch.setattr(
+        loading_maud_inputs, "get_maud_code_hash", lambda: "edited"
+    )
+    assert get_input_hash(files) != input_hash
+
+
+def test_load_maud_input_measurements_csv(tmp_path):
+    """Test that measurements in a csv file are the same as in toml."""
+    files = importlib_resources.files(linear)
+    mi_toml = load_maud_input(data_path=str(files))
+    for f in ["config.toml", "kinetic_model.toml", "priors.toml"]:
+        shutil.copy(files.joinpath(f), tmp_path / f)
+    raw_experiments = toml.load(files.joinpath("experiments.toml"))
+    rows = []
+    for raw_experiment in raw_experiments["experiment"]:
+        for m in raw_experiment.pop("measurements"):
+            rows.append({"experiment": raw_experiment["id"], **m})
+    pd.DataFrame(rows).to_csv(tmp_path / "measurements.csv", index=False)
+    with open(tmp_path / "experiments.toml", "w") as f:
+        toml.dump(raw_experiments, f)
+    config = (tmp_path / "config.toml").read_text()
+    (tmp_path / "config.toml").write_text(
+        'measurements_file = "measurements.csv"\n' + config
+    )
+    mi_csv = load_maud_input(data_path=str(tmp_path))
+    assert all(e.measurements == [] for e in mi_csv.experiments)
+    for k, v in mi_toml.stan_input_train.items():
+        assert_equal(mi_csv.stan_input_train[k], v, err_msg=k)
+    for k, v in mi_toml.inits_dict.items():
+        assert_equal(mi_csv.inits_dict[k], v, err_msg=k)
+
+
+def test_maud_input_incremental_cache():
+    """Test that new experiments only clear experiment-dependent stages."""
+    files = importlib_resources.files(linear)
+    mi = load_maud_input(data_path=str(files))
+    _ = (mi.stan_input_train, mi.inits_dict)
+    network_properties_input = mi.network_properties_input
+    kinetic_prior_inputs = mi.kinetic_prior_inputs
+    km = mi.parameters.km
+    experiments_input = mi.experiments_input
+    mi.experiments = [e for e in mi.experiments if e.id == "condition1"]
+    assert mi.network_properties_input is network_properties_input
+    assert mi.kinetic_prior_inputs is kinetic_prior_inputs
+    assert mi.parameters.km is km
+    assert mi.experiments_input is not experiments_input
+    fresh = load_maud_input(data_path=str(files))
+    fresh.experiments = [e for e in fresh.experiments if e.id == "condition1"]
+    fresh.clear_cache()
+    for k, v in fresh.stan_input_train.items():
+        assert_equal(mi.stan_input_train[k], v, err_msg=k)
+    for k, v in fresh.inits_dict.items():
+        assert_equal(mi.inits_dict[k], v, err_msg=k)
+    mi.config = mi.config.model_copy(
+        update={"default_initial_concentration": 0.5}
+    )
+    assert mi.network_properties_input is network_properties_input
+    assert mi.stan_input_train["conc_init"] is mi.conc_init[0]
+
+
+def test_maud_input_model_copy_clears_cache():
+    """Test that swapping experiments with model_copy gives fresh inputs."""
+    files = importlib_resources.files(linear)
+    mi = load_maud_input(data_path=str(files))
+    _ = (
+        mi.stan_input_train,
+        mi.inits_dict,
+        mi.experiments[0].measurement_table,
+    )
+    network_properties_input = mi.network_properties_input
+    condition1 = mi.experiments[0].model_copy(
+        update={"measurements": mi.experiments[0].measurements[:1]}
+    )
+    assert len(condition1.measurement_table) == 1
+    copied = mi.model_copy(update={"experiments": [condition1]})
+    fresh = load_maud_input(data_path=str(files))
+    fresh.experiments = [condition1]
+    fresh.clear_cache()
+    assert copied.network_properties_input is network_properties_input
+    for k, v in fresh.stan_input_train.items():
+        assert_equal(copied.stan_input_train[k], v, err_msg=k)
+    for k, v in fresh.inits_dict.items():
+        assert_equal(copied.inits_dict[k], v, err_msg=k)
+    assert copied.parameters is not mi.parameters
+    assert mi.parameters.experiments == mi.experiments
+    assert len(mi.experiments) == 2
+
+
+def test_maud_bundle_round_trip(tmp_path):
+    """Check that a saved MaudBundle has the same contents as its input."""
+    from maud.data_model.maud_bundle import (
+        get_coords,
+        get_maud_bundle,
+        read_maud_bundle,
+        write_maud_bundle,
+    )
+    from maud.writing_stan_data import dump_stan_json
+
+    methionine_files = importlib_resources.files(methionine)
+    mi = load_maud_input(data_path=str(methionine_files))
+    path = str(tmp_path / "maud_input.npz")
+    write_maud_bundle(get_maud_bundle(mi), path)
+    bundle = read_maud_bundle(path)
+    assert bundle.config == mi.config
+    for mode in ["train", "test"]:
+        assert get_coords(bundle, mode) == get_coords(mi, mode)
+    for field in ["stan_input_train", "stan_input_test", "inits_dict"]:
+        assert json.loads(dump_stan_json(getattr(bundle, field))) == (
+            json.loads(dump_stan_json(getattr(mi, field)))
+        )
+
+
+def test_load_maud_input_from_output(tmp_path):
+    """Check that a Maud output's bundle is only used if it is up to date."""
+    from maud.cli import save_bundle
+    from maud.data_model.maud_bundle import (
+        BUNDLE_FILE_NAME,
+        MaudBundle,
+        read_maud_bundle,
+    )
+    from maud.loading_maud_inputs import load_maud_input_from_output
+    from maud.writing_stan_data import dump_stan_json
+
+    user_input_path = tmp_path / "user_input"
+    shutil.copytree(importlib_resources.files(linear), user_input_path)
+    mi = load_maud_input(str(user_input_path))
+    save_bundle(mi, str(tmp_path))
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        bundle = load_maud_input_from_output(str(tmp_path))
+    assert isinstance(bundle, MaudBundle)
+    assert dump_stan_json(bundle.stan_input_train) == (
+        dump_stan_json(mi.stan_input_train)
+    )
+    config_path = user_input_path / "config.toml"
+    config_path.write_text(config_path.read_text() + "\n# edited\n")
+    with pytest.warns(UserWarning, match="have changed"):
+        mi_reloaded = load_maud_input_from_output(str(tmp_path))
+    assert isinstance(mi_reloaded, MaudInput)
+    assert mi_reloaded.kinetic_model == mi.kinetic_model
+    bundle_path = tmp_path / BUNDLE_FILE_NAME
+    with np.load(bundle_path) as npz:
+        arrays = dict(npz)
+    arrays["stan_input_train.N_mic"] = arrays["stan_input_train.N_mic"] + 1
+    np.savez_compressed(bundle_path, **arrays)
+    with pytest.raises(ValueError, match="corrupted"):
+        read_maud_bundle(str(bundle_path))
+    with pytest.warns(UserWarning, match="corrupted"):
+        load_maud_input_from_output(str(tmp_path))
@@ -0,0 +1,121 @@
+"""Unit tests for initial values specifications."""
+
+import numpy as np
+from numpy.testing import assert_allclose, assert_equal
+
+from maud.data_model.experiment import MeasurementTable
+from maud.data_model.maud_init import (
+    Init1d,
+    Init2d,
+    InitAtomInput,
+    apply_overrides,
+)
+from maud.data_model.prior import IndPrior1d, IndPrior2d
+
+
+def get_measurements(experiments, targets, values) -> MeasurementTable:
+    """Get a MeasurementTable of mic measurements."""
+    experiment_ids = list(dict.fromkeys(experiments))
+    return MeasurementTable(
+        experiment_ids=experiment_ids,
+        experiment_code=np.array(
+            [experiment_ids.index(e) for e in experiments]
+        ),
+        target_type=np.array(["mic"] * len(targets)),
+        target_id=np.array(targets),
+        value=np.array(values, dtype=float),
+        error_scale=np.ones(len(values)),
+    )
+
+
+def test_apply_overrides():
+    """Check that overrides are set in place at their positions."""
+    values = np.zeros((2, 3))
+    result = apply_overrides(values, {(0, 2): 1.0, (1, 0): 2.0})
+    assert result is values
+    assert_equal(values, [[0.0, 0.0, 1.0], [2.0, 0.0, 0.0]])
+    assert_equal(apply_overrides(np.ones(2), {}), [1.0, 1.0])
+
+
+def test_init_1d():
+    """Check that user inits beat measurements, which beat the prior."""
+    ids = [["M1_c", "M2_c", "M3_c"]]
+    id_components = [["metabolite", "compartment"]]
+    prior = IndPrior1d(
+        user_input=None,
+        ids=ids,
+        id_components=id_components,
+        non_negative=True,
+        default_loc=0.0,
+        default_scale=2.0,
+    )
+    init = Init1d(
+        ids=ids,
+        id_components=id_components,
+        prior=prior,
+        param_init_input=[
+            InitAtomInput(metabolite="M3", compartment="c", init=3.0),
+            InitAtomInput(metabolite="M2", compartment="c", init=4.0),
+            InitAtomInput(metabolite="missing", compartment="c", init=5.0),
+        ],
+        non_negative=True,
+        measurements=get_measurements(
+            ["x1", "x1", "x1"], ["M2_c", "M1_c", "missing_c"], [0.5, 2.0, 6.0]
+        ),
+    )
+    assert init.inits_unscaled.shape == (3,)
+    assert_equal(init.inits_unscaled, [2.0, 4.0, 3.0])
+    assert_allclose(init.inits_scaled, np.log([2.0, 4.0, 3.0]) / 2.0)
+    assert init.inits_unscaled is init.inits_unscaled
+
+
+def test_init_2d():
+    """Check that 2d inits are placed by experiment and target id."""
+    ids = [["x1", "x2"], ["r1", "r2"]]
+    id_components = [["experiment"], ["reaction"]]
+    prior = IndPrior2d(
+        user_input=None,
+        ids=ids,
+        id_components=id_components,
+        non_negative=False,
+        default_loc=1.0,
+        default_scale=0.5,
+    )
+    init = Init2d(
+        ids=ids,
+        id_components=id_components,
+        prior=prior,
+        param_init_input=[
+            InitAtomInput(experiment="x1", reaction="r2", init=3.0),
+            InitAtomInput(experiment="x3", reaction="r1", init=4.0),
+        ],
+        non_negative=False,
+        measurements=get_measurements(
+            ["x2", "x3", "x2"], ["r1", "r1", "r3"], [2.0, 5.0, 6.0]
+        ),
+    )
+    assert_equal(init.inits_unscaled, [[1.0, 3.0], [2.0, 1.0]])
+    assert_equal(init.inits_scaled, [[0.0, 4.0], [2.0, 0.0]])
+
+
+def test_init_2d_without_experiments():
+    """Check that a parameter with no experiments has empty inits."""
+    ids = [[], ["r1", "r2"]]
+    id_components = [["experiment"], ["reaction"]]
+    prior = IndPrior2d(
+        user_input=None,
+        ids=ids,
+        id_components=id_components,
+        non_negative=True,
+        default_loc=0.0,
+        default_scale=1.0,
+    )
+    init = Init2d(
+        ids=ids,
+        id_components=id_components,
+        prior=prior,
+        param_init_input=None,
+        non_negative=True,
+    )
+    assert init.inits_unscaled.shape == (0, 2)
+    assert init.inits_scaled.shape == (0, 2)
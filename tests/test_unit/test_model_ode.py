@@ -1,15 +1,22 @@
 """Unit tests for model ode function."""
 
+import time
 from dataclasses import dataclass
 from pathlib import Path
 from typing import List, Tuple
 
 import importlib_resources
+import numpy as np
 import pytest
 from numpy import isclose
 
-from maud.data.example_inputs import example_ode
-from maud.running_stan import load_stan_model
+from maud.data.example_inputs import example_ode, methionine
+from maud.loading_maud_inputs import load_maud_input
+from maud.running_stan import load_stan_model, predict
+
+N_DRAWS_BENCHMARK = 50
+LOG_CONC_RTOL = 1e-5
+LOG_CONC_TIME_BUDGET_RATIO = 1.5
 
 
 @dataclass
@@ -84,3 +91,111 @@ def test_model_ode(test_case):
                 expected_value=expected_value.value,
                 sim_value=sim_value,
             )
+
+
+@pytest.mark.parametrize("grainsize", [1, 4, 6])
+def test_model_log_density(grainsize):
+    """Check the log density at the methionine inits for any grainsize.
+
+    The expected value is the log density before the likelihood was split
+    between experiments with reduce_sum.
+
+    """
+    mi = load_maud_input(str(importlib_resources.files(methionine)))
+    model = load_stan_model("model", stanc_options={}, cpp_options={})
+    log_density = model.log_prob(
+        params=mi.inits_dict,
+        data={**mi.stan_input_train, "grainsize": grainsize},
+        sig_figs=12,
+    )
+    assert isclose(log_density["lp__"].iloc[0], -7143.04369193680, rtol=1e-9)
+
+
+def simulate_steady_states(model, mi, n_draws, **data_updates):
+    """Simulate the training steady states at mi's inits n_draws times.
+
+    Returns the concentrations from the first draw and the time per draw.
+
+    """
+    start = time.perf_counter()
+    mcmc = model.sample(
+        data={**mi.stan_input_train, **data_updates},
+        inits=mi.inits_dict,
+        chains=1,
+        fixed_param=True,
+        adapt_engaged=False,
+        iter_sampling=n_draws,
+        show_progress=False,
+        threads_per_chain=1,
+        sig_figs=12,
+    )
+    elapsed = time.perf_counter() - start
+    return mcmc.stan_variable("conc_train")[0], elapsed / n_draws
+
+
+@pytest.mark.benchmark
+@pytest.mark.parametrize("example", [methionine, example_ode])
+def test_log_concentration_ode(example):
+    """Compare the log concentration ODE with the linear one.
+
+    At the example's tolerances the log concentration steady states should
+    match a tightly solved reference. They should take about as long as
+    linear steady states solved with an abs_tol small enough to come close
+    to that accuracy.
+
+    """
+    mi = load_maud_input(str(importlib_resources.files(example)))
+    model = load_stan_model("model", stanc_options={}, cpp_options={})
+    reference, _ = simulate_steady_states(
+        model, mi, 1, rel_tol_ode=1e-12, abs_tol_ode=1e-18
+    )
+    conc_log, log_time = simulate_steady_states(
+        model, mi, N_DRAWS_BENCHMARK, log_conc_ode=1
+    )
+    _, linear_time = simulate_steady_states(
+        model, mi, N_DRAWS_BENCHMARK, abs_tol_ode=1e-10
+    )
+    np.testing.assert_allclose(conc_log, reference, rtol=LOG_CONC_RTOL)
+    assert log_time < LOG_CONC_TIME_BUDGET_RATIO * linear_time, (
+        f"Log concentration steady states took {log_time * 1e3:.1f}ms per "
+        f"draw, linear ones {linear_time * 1e3:.1f}ms"
+    )
+
+
+def test_predict_keeps_the_draws_around_a_failed_one(tmp_path):
+    """Check that a draw whose simulation fails only loses its own row.
+
+    All training draws are at the example_ode inits, except that the second
+    draw's km is nan, so its test experiment has no steady state.
+
+    """
+    mi = load_maud_input(str(importlib_resources.files(example_ode)))
+    model = load_stan_model("model", stanc_options={}, cpp_options={})
+    mcmc = model.sample(
+        data=mi.stan_input_train,
+        inits=mi.inits_dict,
+        chains=1,
+        fixed_param=True,
+        adapt_engaged=False,
+        iter_sampling=3,
+        show_progress=False,
+        threads_per_chain=1,
+        output_dir=tmp_path / "train",
+    )
+    lines = Path(mcmc.runset.csv_files[0]).read_text().splitlines()
+    rows = [i for i, line in enumerate(lines) if not line.startswith("#")]
+    columns = lines[rows[0]].split(",")
+    bad_draw = lines[rows[2]].split(",")
+    for i, column in enumerate(columns):
+        if column.startswith("km."):
+            bad_draw[i] = "nan"
+    lines[rows[2]] = ",".join(bad_draw)
+    fit_csv = tmp_path / "train" / "fit.csv"
+    fit_csv.write_text("\n".join(lines) + "\n")
+    predict_dir = tmp_path / "predict"
+    predict_dir.mkdir()
+    idata = predict(mi, str(predict_dir), [str(fit_csv)])
+    conc_test = idata.posterior["conc_test"].values
+    assert conc_test.shape[:2] == (1, 3)
+    assert np.isnan(conc_test[0, 1]).all()
+    assert np.isfinite(conc_test[0, [0, 2]]).all()
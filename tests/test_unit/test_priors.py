@@ -0,0 +1,60 @@
+"""Unit tests for prior construction."""
+
+import numpy as np
+import pytest
+from numpy.testing import assert_allclose, assert_equal
+from pydantic import ValidationError
+
+from maud.data_model.parameter_input import ParameterInputAtom
+from maud.data_model.prior import IndPrior1d, IndPrior2d
+
+
+def test_ind_prior_1d():
+    """Test that user input overrides the default location and scale."""
+    prior = IndPrior1d(
+        user_input=[
+            ParameterInputAtom(enzyme="e2", location=1.0, scale=0.5),
+            ParameterInputAtom(enzyme="not_an_enzyme", location=1, scale=1),
+        ],
+        ids=[["e1", "e2"]],
+        id_components=[["enzyme"]],
+        non_negative=False,
+        default_loc=0.0,
+        default_scale=2.0,
+    )
+    assert_equal(prior.location, [0.0, 1.0])
+    assert_equal(prior.scale, [2.0, 0.5])
+    assert prior.location is prior.location
+
+
+def test_ind_prior_2d():
+    """Test that 2d priors are filled by row and column id."""
+    prior = IndPrior2d(
+        user_input=[
+            ParameterInputAtom(
+                experiment="x2", reaction="r1", exploc=np.e, scale=0.5
+            )
+        ],
+        ids=[["x1", "x2"], ["r1", "r2"]],
+        id_components=[["experiment"], ["reaction"]],
+        non_negative=True,
+        default_loc=0.0,
+        default_scale=1.0,
+    )
+    assert_allclose(prior.location, [[0.0, 0.0], [1.0, 0.0]])
+    assert_equal(prior.scale, [[1.0, 1.0], [0.5, 1.0]])
+
+
+def test_ind_prior_null_location():
+    """Test that null locations are rejected."""
+    with pytest.raises(ValidationError):
+        IndPrior1d(
+            user_input=[
+                ParameterInputAtom(enzyme="e1", location=np.nan, scale=1.0)
+            ],
+            ids=[["e1"]],
+            id_components=[["enzyme"]],
+            non_negative=False,
+            default_loc=0.0,
+            default_scale=1.0,
+        )
@@ -0,0 +1,40 @@
+"""Unit tests for functions in the running_stan module."""
+
+import os
+
+import importlib_resources
+
+from maud.data.example_inputs import linear
+from maud.loading_maud_inputs import load_maud_input
+from maud.running_stan import set_up_output_dir, stan_num_threads
+
+
+def test_set_up_output_dir(tmp_path):
+    """Check that unchanged Stan data files are not written again."""
+    mi = load_maud_input(str(importlib_resources.files(linear)))
+    set_up_output_dir(str(tmp_path), mi)
+    files = sorted(os.listdir(tmp_path))
+    assert files == [
+        "inits.json",
+        "input_data_test.json",
+        "input_data_train.json",
+    ]
+    for f in files:
+        os.utime(tmp_path / f, ns=(0, 0))
+    set_up_output_dir(str(tmp_path), mi)
+    for f in files:
+        assert os.stat(tmp_path / f).st_mtime_ns == 0
+
+
+def test_stan_num_threads(monkeypatch):
+    """Check that STAN_NUM_THREADS is only set while running CmdStan."""
+    mi = load_maud_input(str(importlib_resources.files(linear)))
+    mi.config = mi.config.model_copy(update={"threads_per_chain": 3})
+    monkeypatch.delenv("STAN_NUM_THREADS", raising=False)
+    with stan_num_threads(mi):
+        assert os.environ["STAN_NUM_THREADS"] == "3"
+    assert "STAN_NUM_THREADS" not in os.environ
+    monkeypatch.setenv("STAN_NUM_THREADS", "2")
+    with stan_num_threads(mi):
+        assert os.environ["STAN_NUM_THREADS"] == "3"
+    assert os.environ["STAN_NUM_THREADS"] == "2"
@@ -0,0 +1,48 @@
+"""Unit tests for functions in the writing_stan_data module."""
+
+import json
+import os
+
+import cmdstanpy
+import numpy as np
+
+from maud import writing_stan_data
+from maud.writing_stan_data import dump_stan_json, write_stan_data
+
+DATA = {
+    "N": 3,
+    "flag": True,
+    "x": np.array([0.1, 1e-300, np.inf]),
+    "ix": np.array([[1, 2], [3, 4]]),
+    "mask": np.array([True, False]),
+    "ragged": [np.array([1.5, 2.5]), np.array([3.5])],
+    "empty": np.empty((0, 3)),
+    "nested": [[1, 2], [3, 4]],
+}
+
+
+def test_dump_stan_json_agrees_with_cmdstanpy(tmp_path):
+    """Check that dump_stan_json writes what cmdstanpy would."""
+    cmdstanpy_path = tmp_path / "cmdstanpy.json"
+    cmdstanpy.utils.write_stan_json(str(cmdstanpy_path), DATA)
+    with open(cmdstanpy_path) as f:
+        expected = json.load(f)
+    assert json.loads(dump_stan_json(DATA)) == expected
+
+
+def test_write_stan_data_skips_unchanged_file(tmp_path, monkeypatch):
+    """Check that a file is only rewritten if the data have changed."""
+    path = tmp_path / "data.json"
+    write_stan_data(str(path), DATA)
+    assert os.listdir(tmp_path) == ["data.json"]
+    assert path.read_text() == dump_stan_json(DATA)
+    written = []
+    monkeypatch.setattr(
+        writing_stan_data,
+        "write_atomically",
+        lambda path, contents: written.append(path),
+    )
+    write_stan_data(str(path), dict(DATA))
+    assert written == []
+    write_stan_data(str(path), {**DATA, "N": 4})
+    assert written == [str(path)]